@@ -0,0 +1,316 @@
+import json
+import random
+import socket
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TranslationError(Exception):
+    """翻译请求失败（重试次数用尽或遇到不可重试的错误）"""
+
+
+class RunawayGuard:
+    """流式回复的异常检测：回复远长于原文，或末尾出现大段循环重复时返回中止原因"""
+
+    # 循环重复的最长周期（字符）和判定为失控所需的最短重复长度
+    MAX_PERIOD = 256
+    MIN_REPEAT_SPAN = 200
+    # 回复每增长这么多字符检查一次重复
+    CHECK_INTERVAL = 64
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self._checked = 0
+
+    def __call__(self, text: str) -> Optional[str]:
+        if len(text) > self.max_chars:
+            return f"回复超过 {self.max_chars} 个字符"
+        if len(text) - self._checked < self.CHECK_INTERVAL:
+            return None
+        self._checked = len(text)
+        for period in range(1, self.MAX_PERIOD + 1):
+            span = max(self.MIN_REPEAT_SPAN, period * 4)
+            if len(text) < span:
+                break
+            window = text[-span:]
+            if window[period:] == window[:-period]:
+                return "回复内容不断重复"
+        return None
+
+
+class AdaptiveLimiter:
+    """AIMD自适应并发限制：请求成功时缓慢提高上限，遇到限流、服务端错误或延迟突增时减半"""
+
+    def __init__(self, max_limit: int, min_limit: int = 1, on_change: Optional[Callable[[int], None]] = None):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.on_change = on_change
+        self._cond = threading.Condition()
+        self._last_decrease = 0.0
+        # 每个输出token耗时的滑动平均，用于识别延迟突增
+        self._latency_per_token = None
+
+    def acquire(self, cancelled: Callable[[], bool] = lambda: False) -> bool:
+        """等待可用的并发名额，取消时返回False"""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                if cancelled():
+                    return False
+                self._cond.wait(0.2)
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        """归还并发名额"""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self, latency: float, completion_tokens: int = 0):
+        """请求成功：延迟正常时加性增加上限，延迟明显高于平均水平时乘性减少"""
+        per_token = latency / max(1, completion_tokens)
+        with self._cond:
+            average = self._latency_per_token
+            self._latency_per_token = per_token if average is None else average * 0.9 + per_token * 0.1
+            if average is not None and per_token > average * 3:
+                self._decrease(latency)
+                return
+            old = int(self.limit)
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            if int(self.limit) != old:
+                self._notify_change()
+            self._cond.notify_all()
+
+    def on_throttle(self, latency: float = 0.0):
+        """遇到限流或服务端错误"""
+        with self._cond:
+            self._decrease(latency)
+
+    def _decrease(self, latency: float):
+        """乘性减少并发上限（调用方需持有锁）"""
+        # 同一轮请求中的多次失败只减半一次
+        now = time.monotonic()
+        if now - self._last_decrease < max(1.0, latency):
+            return
+        self._last_decrease = now
+        old = int(self.limit)
+        self.limit = max(self.min_limit, self.limit / 2)
+        if int(self.limit) != old:
+            self._notify_change()
+
+    def _notify_change(self):
+        """通知并发上限变化"""
+        if self.on_change is not None:
+            self.on_change(int(self.limit))
+
+
+class ChatTransport:
+    """OpenAI兼容对话接口的传输层：连接池复用、带抖动的指数退避重试（遵守Retry-After）以及自适应并发；
+    请求中 stream 为真时以SSE流式接收，每个数据块之间检查取消，abort() 会立即断开进行中的连接"""
+
+    # 可以重试的HTTP状态码
+    RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+    def __init__(self, url: str, api_key: str, max_workers: int = 4, timeout: float = 60,
+                 max_retries: int = 5, backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 cancelled: Callable[[], bool] = lambda: False, log: Callable[[str], None] = lambda message: None):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cancelled = cancelled
+        self.log = log
+        self.limiter = AdaptiveLimiter(max_workers, on_change=lambda limit: log(f"并发上限调整为 {limit}"))
+        # 进行中的流式响应及其取消事件，取消时由 abort() 断开
+        self._responses = {}
+        self._responses_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, max_workers))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        })
+
+    def post_chat(self, payload: dict, call: Optional[dict] = None,
+                  guard: Optional[Callable[[], Callable[[str], Optional[str]]]] = None,
+                  cancel: Optional[threading.Event] = None, max_retries: Optional[int] = None) -> dict:
+        """发送对话请求并返回解析后的JSON（流式请求会拼装成与普通请求相同的结构），失败时抛出 TranslationError；
+        传入 call 时写入本次调用的 attempts / bytes_sent / bytes_received（包括重试）和最近一次发出的时间 sent_at；
+        流式请求时 guard 为回复检测器的工厂（每次尝试创建新的检测器），检测器返回中止原因后立即断开，并按可重试错误处理；
+        cancel 被设置时只取消这一个请求；max_retries 可以覆盖本次请求的重试次数"""
+        if max_retries is None:
+            max_retries = self.max_retries
+        if call is None:
+            call = {}
+        call.update(attempts=0, bytes_sent=0, bytes_received=0)
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        stream = bool(payload.get("stream"))
+        attempt = 0
+        while True:
+            if not self.limiter.acquire(lambda: self.is_cancelled(cancel)):
+                raise TranslationError("翻译已取消")
+            start = time.monotonic()
+            retry_after = None
+            call['attempts'] += 1
+            call['sent_at'] = start
+            call['bytes_sent'] += len(body)
+            try:
+                response = self.session.post(self.url, data=body, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if self.is_cancelled(cancel):
+                    raise TranslationError("翻译已取消")
+                error = f"网络错误: {e}"
+                self.limiter.on_throttle(time.monotonic() - start)
+            else:
+                if stream and response.status_code < 400:
+                    result, error = self.read_stream(response, call, guard() if guard is not None else None, cancel)
+                else:
+                    call['bytes_received'] += len(response.content)
+                    try:
+                        result = response.json() if response.status_code < 400 else None
+                    except ValueError:
+                        result = None
+                    error = "响应不是有效的JSON"
+                latency = time.monotonic() - start
+                if response.status_code < 400:
+                    if isinstance(result, dict):
+                        usage = result.get('usage') or {}
+                        self.limiter.on_success(latency, usage.get('completion_tokens', 0))
+                        return result
+                elif response.status_code in self.RETRY_STATUS:
+                    error = f"HTTP {response.status_code}"
+                    retry_after = self.parse_retry_after(response.headers.get('Retry-After'))
+                    self.limiter.on_throttle(latency)
+                else:
+                    raise TranslationError(f"HTTP {response.status_code}: {response.text[:200]}")
+            finally:
+                self.limiter.release()
+
+            attempt += 1
+            if attempt > max_retries:
+                raise TranslationError(f"重试 {max_retries} 次后仍然失败: {error}" if max_retries else error)
+            # 带完全抖动的指数退避，服务端给出Retry-After时以其为下限
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            self.log(f"{error}，{delay:.1f} 秒后重试 ({attempt}/{max_retries})")
+            if not self.sleep(delay, cancel):
+                raise TranslationError("翻译已取消")
+
+    def is_cancelled(self, cancel: Optional[threading.Event] = None) -> bool:
+        """整次翻译被取消，或单个请求的取消事件已设置"""
+        return self.cancelled() or (cancel is not None and cancel.is_set())
+
+    def read_stream(self, response: requests.Response, call: dict,
+                    guard: Optional[Callable[[str], Optional[str]]] = None,
+                    cancel: Optional[threading.Event] = None):
+        """逐行读取SSE流式响应，返回 (拼装后的结果, None) 或 (None, 错误原因)；
+        取消时抛出 TranslationError"""
+        with self._responses_lock:
+            self._responses[response] = cancel
+        parts = []
+        text = ""
+        usage = None
+        finish_reason = None
+        try:
+            for line in response.iter_lines(chunk_size=None):
+                if self.is_cancelled(cancel):
+                    raise TranslationError("翻译已取消")
+                call['bytes_received'] += len(line) + 1
+                # 空行分隔事件，以冒号开头的是注释（服务端排队时的 keep-alive）
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                # [DONE] 之后继续读到流结束，连接才能放回连接池复用
+                if data == b"[DONE]":
+                    continue
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    return None, "流式响应中有无效的JSON"
+                usage = chunk.get('usage') or usage
+                for choice in chunk.get('choices') or ():
+                    delta = (choice.get('delta') or {}).get('content')
+                    if delta:
+                        parts.append(delta)
+                    finish_reason = choice.get('finish_reason') or finish_reason
+                if parts and guard is not None:
+                    text += "".join(parts)
+                    parts = []
+                    reason = guard(text)
+                    if reason is not None:
+                        return None, f"{reason}，已提前中止"
+        except requests.RequestException as e:
+            if self.is_cancelled(cancel):
+                raise TranslationError("翻译已取消")
+            return None, f"网络错误: {e}"
+        finally:
+            with self._responses_lock:
+                self._responses.pop(response, None)
+            response.close()
+        if self.is_cancelled(cancel):
+            raise TranslationError("翻译已取消")
+        if finish_reason is None:
+            return None, "流式响应不完整"
+        text += "".join(parts)
+        result = {"choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                               "finish_reason": finish_reason}]}
+        if usage is not None:
+            result["usage"] = usage
+        return result, None
+
+    def abort(self, cancel: Optional[threading.Event] = None):
+        """立即断开进行中的流式响应（传入 cancel 时只断开使用该取消事件的请求）；
+        可在其他线程中调用，阻塞在读取上的请求会马上返回"""
+        with self._responses_lock:
+            responses = [response for response, event in self._responses.items() if cancel is None or event is cancel]
+        for response in responses:
+            connection = getattr(response.raw, '_connection', None)
+            sock = getattr(connection, 'sock', None)
+            if sock is None:
+                continue
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def sleep(self, seconds: float, cancel: Optional[threading.Event] = None) -> bool:
+        """可被取消打断的等待，被取消时返回False"""
+        deadline = time.monotonic() + seconds
+        while True:
+            if self.is_cancelled(cancel):
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            time.sleep(min(0.2, remaining))
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """解析Retry-After（秒数或HTTP日期）"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
@@ -0,0 +1,242 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional
+
+from api_transport import ChatTransport, TranslationError
+from run_telemetry import percentile
+
+
+class Backend:
+    """一个OpenAI兼容的对话接口（URL + 模型），记录最近的延迟和错误，供路由和对冲使用"""
+
+    # 每个请求规模保留的延迟样本数
+    HISTORY = 100
+    # 错误率滑动平均的权重
+    ERROR_DECAY = 0.1
+    # 连续失败后暂停使用的最长时间（秒），期间只在其他后端都不可用时使用
+    MAX_COOLDOWN = 60.0
+
+    def __init__(self, name: str, transport: ChatTransport, model: str):
+        self.name = name
+        self.transport = transport
+        self.model = model
+        self.requests = 0
+        self.failures = 0
+        self.hedges = 0
+        self.wins = 0
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self._lock = threading.Lock()
+        # 按请求规模（原文长度的二进制位数）分组的延迟，批量请求和单条请求的延迟不可比
+        self._latencies: Dict[int, deque] = {}
+
+    @staticmethod
+    def size_class(size: int) -> int:
+        return max(0, size).bit_length()
+
+    def record(self, size: int, latency: Optional[float], ok: bool):
+        """记录一次请求的结果（被取消的请求不记录延迟）"""
+        with self._lock:
+            self.requests += 1
+            if ok:
+                self.consecutive_failures = 0
+            else:
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.cooldown_until = time.monotonic() + min(self.MAX_COOLDOWN, 2.0 ** self.consecutive_failures)
+            self.error_rate += ((0.0 if ok else 1.0) - self.error_rate) * self.ERROR_DECAY
+            if ok and latency is not None:
+                self._latencies.setdefault(self.size_class(size), deque(maxlen=self.HISTORY)).append(latency)
+
+    def all_latencies(self) -> List[float]:
+        """所有规模请求的延迟样本"""
+        with self._lock:
+            return [latency for history in self._latencies.values() for latency in history]
+
+    def latencies(self, size: int) -> List[float]:
+        """同规模请求的延迟样本，没有时使用全部样本"""
+        with self._lock:
+            samples = self._latencies.get(self.size_class(size))
+            if samples:
+                return list(samples)
+        return self.all_latencies()
+
+    def available(self) -> bool:
+        """不在连续失败后的暂停期内"""
+        return time.monotonic() >= self.cooldown_until
+
+    def score(self, size: int) -> float:
+        """预计完成时间（越小越好）：延迟中位数按错误率和当前负载放大，没有样本的后端优先试用"""
+        samples = self.latencies(size)
+        if not samples:
+            return 0.0
+        limiter = self.transport.limiter
+        load = limiter.in_flight / max(1, int(limiter.limit))
+        return percentile(samples, 0.5) * (1 + 4 * self.error_rate) * (1 + load)
+
+    def has_capacity(self) -> bool:
+        limiter = self.transport.limiter
+        return limiter.in_flight < int(limiter.limit)
+
+
+class BackendRouter:
+    """把请求发给预计最快的后端；请求超过该后端同规模请求延迟的 hedge_percentile 分位数仍未返回时，
+    向另一个后端（只有一个后端时为同一后端）发送对冲请求，先返回的有效回复胜出，另一个请求立即取消。
+    后端失败时换用其他后端。接口与 ChatTransport 相同，可以直接代替传输层"""
+
+    # 开始对冲前每个规模至少需要的延迟样本数
+    MIN_SAMPLES = 10
+    # 对冲请求最多占全部请求的比例，避免服务整体变慢时请求量翻倍
+    MAX_HEDGE_RATIO = 0.1
+
+    def __init__(self, backends: List[Backend], hedge: bool = True, hedge_percentile: float = 0.95,
+                 hedge_min_delay: float = 2.0, cancelled: Callable[[], bool] = lambda: False,
+                 log: Callable[[str], None] = lambda message: None):
+        if not backends:
+            raise ValueError("至少需要一个后端")
+        self.backends = backends
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.cancelled = cancelled
+        self.log = log
+        self.requests = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+        workers = sum(backend.transport.limiter.max_limit for backend in backends)
+        self._pool = ThreadPoolExecutor(max_workers=2 * workers + 1, thread_name_prefix="backend")
+
+    def rank(self, size: int) -> List[Backend]:
+        """按预计完成时间排序的后端，暂停期内的后端排在最后"""
+        return sorted(self.backends, key=lambda backend: (not backend.available(), backend.score(size)))
+
+    def hedge_delay(self, backend: Backend, size: int) -> Optional[float]:
+        """请求发出后等待多久发送对冲请求，样本不足或超出对冲预算时不对冲"""
+        samples = backend.latencies(size)
+        with self._lock:
+            over_budget = self.hedges >= self.requests * self.MAX_HEDGE_RATIO
+        if not self.hedge or len(samples) < self.MIN_SAMPLES or over_budget:
+            return None
+        return max(self.hedge_min_delay, percentile(samples, self.hedge_percentile))
+
+    def _attempt(self, backend: Backend, payload: dict, guard, size: int, cancel: threading.Event, call: dict,
+                 max_retries: Optional[int]) -> dict:
+        """在后台线程中向一个后端发送请求，返回 {result} 或 {error}"""
+        start = time.monotonic()
+        try:
+            result = backend.transport.post_chat(dict(payload, model=backend.model), call, guard, cancel, max_retries)
+        except TranslationError as e:
+            # 对冲落败或用户取消而中止的请求不算后端失败
+            if not cancel.is_set() and not self.cancelled():
+                backend.record(size, None, False)
+            return {"error": e}
+        try:
+            content = result['choices'][0]['message']['content']
+        except (KeyError, IndexError, TypeError):
+            content = None
+        if not isinstance(content, str) or not content.strip():
+            backend.record(size, None, False)
+            return {"error": TranslationError("响应中没有翻译内容")}
+        backend.record(size, time.monotonic() - call.get('sent_at', start), True)
+        return {"result": result}
+
+    def post_chat(self, payload: dict, call: Optional[dict] = None,
+                  guard: Optional[Callable[[], Callable[[str], Optional[str]]]] = None, size: int = 0) -> dict:
+        """发送对话请求并返回第一个有效回复（失败时抛出 TranslationError）；
+        guard 为每个请求创建回复检测器的工厂，size 为原文长度（用于按规模比较延迟）；
+        call 中写入所有请求合计的 attempts / bytes_sent / bytes_received，以及 backend、model 和 hedged"""
+        if call is None:
+            call = {}
+        call.update(attempts=0, bytes_sent=0, bytes_received=0, backend=None, model=None, hedged=False)
+        with self._lock:
+            self.requests += 1
+        ranked = self.rank(size)
+        untried = list(ranked)
+        running = {}
+        errors = []
+
+        def launch(backend: Backend):
+            cancel = threading.Event()
+            attempt_call = {}
+            if backend in untried:
+                untried.remove(backend)
+            # 还有其他可用后端时出错不在本后端重试，直接换用其他后端
+            max_retries = 0 if any(other.available() for other in untried) else None
+            future = self._pool.submit(self._attempt, backend, payload, guard, size, cancel, attempt_call, max_retries)
+            running[future] = (backend, cancel, attempt_call)
+            return future
+
+        primary = ranked[0]
+        primary_future = launch(primary)
+        delay = self.hedge_delay(primary, size)
+        try:
+            while running:
+                if self.cancelled():
+                    raise TranslationError("翻译已取消")
+                timeout = 0.2
+                if delay is not None and primary_future in running:
+                    # 对冲计时从请求真正发出时开始，不包括等待并发名额的时间
+                    sent_at = running[primary_future][2].get('sent_at')
+                    if sent_at is not None:
+                        remaining = sent_at + delay - time.monotonic()
+                        if remaining <= 0:
+                            # 优先选择有空闲并发名额的其他后端，没有其他可用后端时发给同一后端
+                            candidates = [backend for backend in ranked[1:] if backend.available()] or [primary]
+                            target = next((backend for backend in candidates if backend.has_capacity()), candidates[0])
+                            call['hedged'] = True
+                            with self._lock:
+                                self.hedges += 1
+                            target.hedges += 1
+                            self.log(f"请求超过 {delay:.1f} 秒未返回，向 {target.name} 发送对冲请求")
+                            launch(target)
+                            delay = None
+                        else:
+                            timeout = min(timeout, remaining)
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    backend, _, attempt_call = running.pop(future)
+                    outcome = future.result()
+                    for name in ("attempts", "bytes_sent", "bytes_received"):
+                        call[name] += attempt_call.get(name, 0)
+                    if "result" in outcome:
+                        backend.wins += 1
+                        call['backend'] = backend.name
+                        call['model'] = backend.model
+                        return outcome["result"]
+                    errors.append(f"{backend.name}: {outcome['error']}")
+                    # 失败时换用还没有尝试过的后端
+                    if not running and untried and not self.cancelled():
+                        self.log(f"{backend.name} 请求失败，改用 {untried[0].name}")
+                        launch(untried[0])
+        finally:
+            # 取消仍在进行的请求（对冲中较慢的一个）
+            for future, (backend, cancel, _) in running.items():
+                cancel.set()
+                future.cancel()
+                backend.transport.abort(cancel)
+        if self.cancelled():
+            raise TranslationError("翻译已取消")
+        raise TranslationError("; ".join(errors))
+
+    def abort(self):
+        """立即断开所有后端进行中的流式响应"""
+        for backend in self.backends:
+            backend.transport.abort()
+
+    def stats_message(self) -> str:
+        """每个后端一段的请求统计"""
+        parts = []
+        for backend in self.backends:
+            samples = backend.all_latencies()
+            parts.append(f"{backend.name}（{backend.model}）: 请求 {backend.requests} 次, 失败 {backend.failures}, "
+                         f"对冲 {backend.hedges}, 胜出 {backend.wins}, 延迟 p50 {percentile(samples, 0.5):.2f}s")
+        return "后端: " + "; ".join(parts)
+
+    def close(self):
+        """关闭线程池和所有后端的连接池"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for backend in self.backends:
+            backend.transport.close()
@@ -0,0 +1,184 @@
+"""端到端翻译吞吐基准：对本地模拟接口运行完整翻译流程（无界面），不消耗API额度
+
+每个场景在独立子进程中运行（峰值内存互不影响），场景为 文本项数量 × 目标语言数量。
+输出 文本项/秒、单个任务延迟的 p50/p99、请求数和峰值内存，可用 --save 保存结果，
+之后用 --baseline 与保存的结果对比。
+
+用法:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --tokens 10,1000,10000 --languages 1,29 --latency 0.05 --save base.json
+    python benchmarks/bench_pipeline.py --baseline base.json --throttle-rate 0.05 --malformed-rate 0.02
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_deepseek import MockOptions, start_server  # noqa: E402
+from vdf_keyvalues import write_localization  # noqa: E402
+from vdf_translator import STEAM_LANGUAGES, VDFTranslator  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class BenchTranslator(VDFTranslator):
+    """记录每个翻译任务耗时的无界面翻译器"""
+
+    def __init__(self, config_file: str):
+        super().__init__(config_file)
+        self.job_latencies = []
+
+    def run_job(self, languages, items):
+        start = time.perf_counter()
+        try:
+            return super().run_job(languages, items)
+        finally:
+            self.job_latencies.append(time.perf_counter() - start)
+
+    def log_message(self, message):
+        pass
+
+
+def write_source(path: str, count: int):
+    """生成包含部分重复原文的简体中文源文件"""
+    items = ((f"NEW_ACHIEVEMENT_{i}_{'NAME' if i % 2 == 0 else 'DESC'}",
+              f"成就 {i // 2}" if i % 2 == 0 else f"完成第 {i % 97} 关卡并收集所有宝物")
+             for i in range(count))
+    write_localization(path, "schinese", items)
+
+
+def percentile(values, fraction: float) -> float:
+    """计算分位数（最近秩法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+
+def peak_rss_mb():
+    """当前进程的峰值内存（MB），不支持的平台返回None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为KB，macOS 为字节
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_scenario(args) -> dict:
+    """在当前进程中运行一个场景并返回结果"""
+    options = MockOptions(args.latency, args.latency_sigma, args.error_rate, args.throttle_rate,
+                          args.malformed_rate, args.retry_after, args.seed, args.runaway_rate)
+    server, url, stats = start_server(options)
+    languages = [lang for lang in STEAM_LANGUAGES if lang != "schinese"][:args.language_count]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_file = os.path.join(temp_dir, "480_loc_schinese.vdf")
+        write_source(source_file, args.token_count)
+
+        translator = BenchTranslator(os.path.join(temp_dir, "config.ini"))
+        translator.api_url = url
+        translator.api_key = "mock"
+        translator.batch_size = args.batch_size
+        translator.max_workers = args.workers
+        translator.multi_target = args.multi_target
+        translator.stream = not args.no_stream
+        translator.transport = translator.create_transport()
+        for backend in translator.transport.backends:
+            backend.transport.backoff_base = 0.05
+
+        start = time.perf_counter()
+        statuses = translator.translate_file(source_file, temp_dir, languages)
+        elapsed = time.perf_counter() - start
+        translator.transport.close()
+        translator.translation_memory.close()
+    server.shutdown()
+
+    items = args.token_count * len(languages)
+    return {
+        "tokens": args.token_count,
+        "languages": len(languages),
+        "seconds": round(elapsed, 3),
+        "items_per_second": round(items / elapsed, 1) if elapsed else 0.0,
+        "jobs": len(translator.job_latencies),
+        "job_p50": round(percentile(translator.job_latencies, 0.50), 4),
+        "job_p99": round(percentile(translator.job_latencies, 0.99), 4),
+        "requests": stats.as_dict()["requests"],
+        "failed_languages": sum(1 for status in statuses.values() if status != "completed"),
+        "peak_rss_mb": None if peak_rss_mb() is None else round(peak_rss_mb(), 1),
+    }
+
+
+def parse_counts(value: str):
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="端到端翻译吞吐基准（使用本地模拟接口）")
+    parser.add_argument("--tokens", type=parse_counts, default=[10, 100, 1000, 10000], help="文本项数量，逗号分隔")
+    parser.add_argument("--languages", type=parse_counts, default=[1, 8, 29], help="目标语言数量，逗号分隔（最多29）")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--multi-target", action="store_true", help="使用多语言合并请求")
+    parser.add_argument("--no-stream", action="store_true", help="不使用流式接收")
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟接口延迟中位数（秒）")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--runaway-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="把结果保存为JSON文件")
+    parser.add_argument("--baseline", help="与之前保存的JSON结果对比")
+    # 子进程内部使用
+    parser.add_argument("--token-count", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--language-count", type=int, help=argparse.SUPPRESS)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.token_count is not None:
+        print(json.dumps(run_scenario(args)))
+        return
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = {(row["tokens"], row["languages"]): row for row in json.load(file)}
+
+    passthrough = sys.argv[1:]
+    print(f"{'tokens':>8}{'语言':>6}{'耗时(s)':>10}{'项/秒':>10}{'请求数':>8}{'p50(s)':>9}{'p99(s)':>9}{'峰值MB':>9}{'对比':>9}")
+    results = []
+    for token_count in args.tokens:
+        for language_count in args.languages:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), *passthrough,
+                 "--token-count", str(token_count), "--language-count", str(min(29, language_count))],
+                check=True, capture_output=True, text=True
+            ).stdout
+            row = json.loads(output.strip().splitlines()[-1])
+            results.append(row)
+            previous = baseline.get((row["tokens"], row["languages"]))
+            ratio = f"{row['items_per_second'] / previous['items_per_second']:.2f}x" if previous and previous["items_per_second"] else "-"
+            rss = "-" if row["peak_rss_mb"] is None else f"{row['peak_rss_mb']:.1f}"
+            print(f"{row['tokens']:>8}{row['languages']:>6}{row['seconds']:>10.3f}{row['items_per_second']:>10.1f}"
+                  f"{row['requests']:>8}{row['job_p50']:>9.3f}{row['job_p99']:>9.3f}{rss:>9}{ratio:>9}")
+            if row["failed_languages"]:
+                print(f"  警告: {row['failed_languages']} 种语言翻译失败")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=1)
+
+
+if __name__ == "__main__":
+    main()
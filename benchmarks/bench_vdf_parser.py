@@ -0,0 +1,58 @@
+"""VDF解析器基准测试：生成不同大小的本地化文件，验证解析耗时随文件大小线性增长
+
+用法: python benchmarks/bench_vdf_parser.py [最大MB数]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vdf_keyvalues import read_localization  # noqa: E402
+
+
+def write_sample(path: str, target_bytes: int) -> int:
+    """生成包含转义、注释、条件和多行值的本地化文件，返回token数量"""
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='\n') as file:
+        file.write('"lang"\n{\n\t"Language" "schinese"\n\t"Tokens"\n\t{\n')
+        while file.tell() < target_bytes:
+            file.write(f'\t\t// 第 {count} 组\n')
+            file.write(f'\t\t"NEW_ACHIEVEMENT_1_{count}_NAME"\t"成就 \\"{count}\\" 名称"\n')
+            file.write(f'\t\t"NEW_ACHIEVEMENT_1_{count}_DESC"\t"第一行\n第二行 C:\\\\path"\t[$WIN32]\n')
+            file.write(f'\t\t"#Status_{count}"\t"{{#Map_{count}}} - %score%"\n')
+            count += 3
+        file.write('\t}\n}\n')
+    return count
+
+
+def main():
+    max_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    sizes = []
+    mb = 1
+    while mb <= max_mb:
+        sizes.append(mb)
+        mb *= 2
+
+    print(f"{'大小(MB)':>10}{'tokens':>12}{'耗时(s)':>10}{'MB/s':>10}{'s/MB':>10}")
+    base = None
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for mb in sizes:
+            path = os.path.join(temp_dir, f"bench_{mb}.vdf")
+            count = write_sample(path, mb * 1024 * 1024)
+            start = time.perf_counter()
+            _, tokens = read_localization(path)
+            elapsed = time.perf_counter() - start
+            assert len(tokens) == count, (len(tokens), count)
+            per_mb = elapsed / mb
+            base = base or per_mb
+            print(f"{mb:>10}{count:>12}{elapsed:>10.3f}{mb / elapsed:>10.1f}{per_mb:>10.3f}")
+            os.remove(path)
+
+    # 线性复杂度下每MB耗时应基本保持不变
+    print(f"最大文件每MB耗时 / 1MB文件每MB耗时 = {per_mb / base:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""本地模拟的DeepSeek对话接口（/v1/chat/completions），用于离线测试和基准测试，不消耗API额度
+
+可配置延迟分布、服务端错误率、429限流率、格式错误回复和失控（不断重复）回复的比例。
+译文是原文加上语言前缀，批量（JSON）请求按提示词中的JSON对象逐项返回。
+请求中 stream 为真时以SSE流式返回（等待期间发送 keep-alive 注释，与DeepSeek相同）。
+
+用法: python benchmarks/mock_deepseek.py [--port 8765] [--latency 0.2] [--error-rate 0.01] [--throttle-rate 0.05]
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+# 上下文缓存的前缀粒度（字符）
+CACHE_UNIT = 64
+# 流式回复每个数据块的字符数
+STREAM_CHUNK = 8
+
+# 多语言请求中的语言列表，例如 english（英语）、french（法语）
+_LANGUAGE_RE = re.compile(r'([a-z]+)（')
+# 单一语言请求中的目标语言名称
+_LANGUAGE_NAME_RE = re.compile(r'目标语言: (\S+)\n')
+_HAN_RE = re.compile(r'[一-鿿]')
+
+# 假译文中代替汉字的字符，使译文使用目标语言的文字（通过译文检查），未列出的语言使用拉丁字母
+SCRIPT_LETTERS = {
+    "russian": "ж", "ukrainian": "ж", "bulgarian": "ж", "greek": "λ", "thai": "ก", "arabic": "ع",
+    "koreana": "한", "japanese": "の", "schinese": None, "tchinese": None,
+}
+LANGUAGE_CODES = {
+    "俄语": "russian", "乌克兰语": "ukrainian", "保加利亚语": "bulgarian", "希腊语": "greek", "泰语": "thai",
+    "阿拉伯语": "arabic", "韩语": "koreana", "日语": "japanese", "简体中文": "schinese", "繁体中文": "tchinese",
+}
+
+
+class MockOptions:
+    """模拟服务器的行为参数"""
+
+    def __init__(self, latency: float = 0.05, latency_sigma: float = 0.5, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, malformed_rate: float = 0.0, retry_after: float = 0.1,
+                 seed: Optional[int] = None, runaway_rate: float = 0.0, runaway_chars: int = 20000):
+        # 延迟服从对数正态分布：latency 为中位数（秒），latency_sigma 控制长尾
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.malformed_rate = malformed_rate
+        self.retry_after = retry_after
+        # 失控回复：在正常回复后不断重复同一段文本，共 runaway_chars 个字符
+        self.runaway_rate = runaway_rate
+        self.runaway_chars = runaway_chars
+        self.random = random.Random(seed)
+
+
+class MockStats:
+    """请求计数（线程安全）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.malformed = 0
+        self.runaway = 0
+        # 客户端在流式回复结束前断开的次数
+        self.aborted = 0
+        self.prompt_tokens = 0
+        self.prompt_cache_hit_tokens = 0
+        self.completion_tokens = 0
+        # 已见过的提示词前缀，用于模拟DeepSeek的上下文硬盘缓存
+        self.prefixes = set()
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {name: getattr(self, name) for name in
+                    ("requests", "errors", "throttled", "malformed", "runaway", "aborted", "prompt_tokens",
+                     "prompt_cache_hit_tokens", "completion_tokens")}
+
+    def cached_prefix(self, prompt: str) -> int:
+        """返回与之前请求相同的最长前缀长度（按 CACHE_UNIT 对齐），并记录本次请求的前缀"""
+        with self.lock:
+            hit = 0
+            for end in range(CACHE_UNIT, len(prompt) + 1, CACHE_UNIT):
+                if hash(prompt[:end]) not in self.prefixes:
+                    break
+                hit = end
+            for end in range(hit + CACHE_UNIT, len(prompt) + 1, CACHE_UNIT):
+                self.prefixes.add(hash(prompt[:end]))
+            return hit
+
+
+def extract_payload(prompt: str) -> Optional[dict]:
+    """取出提示词中待翻译的JSON对象（从最后一个以 { 开头的行开始）"""
+    start = prompt.rfind('\n{')
+    start = start + 1 if start != -1 else prompt.find('{')
+    if start == -1:
+        return None
+    try:
+        data = json.loads(prompt[start:])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def fake_translate(text: str, language: str) -> str:
+    """生成可识别的假译文：语言前缀加上把汉字替换为目标语言文字的原文（占位符保持不变）"""
+    letter = SCRIPT_LETTERS.get(language, "a")
+    return f"[{language}] {text if letter is None else _HAN_RE.sub(letter, text)}"
+
+
+def build_reply(messages: list, json_mode: bool) -> str:
+    """根据请求内容生成回复文本"""
+    prompt = "\n".join(str(message.get("content", "")) for message in messages if isinstance(message, dict))
+    payload = extract_payload(prompt) if json_mode else None
+    name = _LANGUAGE_NAME_RE.search(prompt)
+    language = LANGUAGE_CODES.get(name.group(1), "xx") if name else "xx"
+    if payload is None:
+        # 单条翻译：取 "原文:" 之后的一行
+        match = re.search(r'原文:\s*(.*)', prompt)
+        return fake_translate(match.group(1).strip() if match else prompt.strip()[:50], language)
+    languages = _LANGUAGE_RE.findall(prompt)
+    if "分别翻译" in prompt and languages:
+        return json.dumps({key: {lang: fake_translate(value, lang) for lang in languages}
+                           for key, value in payload.items()}, ensure_ascii=False)
+    return json.dumps({key: fake_translate(value, language) for key, value in payload.items()}, ensure_ascii=False)
+
+
+def malform(reply: str, rng: random.Random) -> str:
+    """把回复改成格式错误的样子：截断、丢失一项或不是JSON"""
+    choice = rng.randrange(3)
+    if choice == 0:
+        return reply[:max(1, len(reply) // 2)]
+    if choice == 1:
+        try:
+            data = json.loads(reply)
+        except ValueError:
+            return "抱歉，我无法完成这个翻译。"
+        if isinstance(data, dict) and data:
+            data.pop(next(iter(data)))
+            return json.dumps(data, ensure_ascii=False)
+    return "抱歉，我无法完成这个翻译。"
+
+
+def make_handler(options: MockOptions, stats: MockStats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status: int, body: dict, headers: Tuple[Tuple[str, str], ...] = ()):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+
+        def send_event(self, event):
+            """发送一个SSE事件（dict 编码为 data: JSON，str 原样作为一行）"""
+            line = f"data: {json.dumps(event, ensure_ascii=False)}" if isinstance(event, dict) else event
+            self.send_chunk((line + "\n\n").encode('utf-8'))
+
+        def start_stream(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+        def stream_reply(self, model: str, reply: str, usage: dict):
+            """分块发送回复，客户端断开时停止"""
+            try:
+                for start in range(0, len(reply), STREAM_CHUNK):
+                    self.send_event({"id": "mock", "object": "chat.completion.chunk", "model": model,
+                                     "choices": [{"index": 0, "delta": {"content": reply[start:start + STREAM_CHUNK]},
+                                                  "finish_reason": None}]})
+                self.send_event({"id": "mock", "object": "chat.completion.chunk", "model": model,
+                                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                self.send_event({"id": "mock", "object": "chat.completion.chunk", "model": model,
+                                 "choices": [], "usage": usage})
+                self.send_event("data: [DONE]")
+                self.send_chunk(b"")
+            except OSError:
+                stats.add(aborted=1)
+                self.close_connection = True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self.send_json(400, {"error": {"message": "invalid JSON"}})
+                return
+            stats.add(requests=1)
+            rng = options.random
+            delay = rng.lognormvariate(0, options.latency_sigma) * options.latency if options.latency > 0 else 0
+            stream = bool(request.get("stream"))
+            if not stream:
+                time.sleep(delay)
+
+            roll = rng.random()
+            if stream and roll >= options.throttle_rate + options.error_rate:
+                # 流式请求先返回响应头，排队期间每秒发送一次 keep-alive
+                self.start_stream()
+                try:
+                    deadline = time.monotonic() + delay
+                    while time.monotonic() < deadline:
+                        time.sleep(min(1.0, deadline - time.monotonic()))
+                        if time.monotonic() < deadline:
+                            self.send_event(": keep-alive")
+                except OSError:
+                    stats.add(aborted=1)
+                    self.close_connection = True
+                    return
+            elif stream:
+                time.sleep(delay)
+            if roll < options.throttle_rate:
+                stats.add(throttled=1)
+                self.send_json(429, {"error": {"message": "rate limited"}},
+                               (("Retry-After", f"{options.retry_after:g}"),))
+                return
+            if roll < options.throttle_rate + options.error_rate:
+                stats.add(errors=1)
+                self.send_json(503, {"error": {"message": "server busy"}})
+                return
+
+            messages = request.get("messages") or []
+            json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+            reply = build_reply(messages, json_mode)
+            if rng.random() < options.malformed_rate:
+                stats.add(malformed=1)
+                reply = malform(reply, rng)
+            elif rng.random() < options.runaway_rate:
+                stats.add(runaway=1)
+                reply = (reply + "重复的内容" * options.runaway_chars)[:max(len(reply), options.runaway_chars)]
+
+            prompt = "".join(f"{message.get('role')}:{message.get('content', '')}" for message in messages if isinstance(message, dict))
+            prompt_tokens = len(prompt) // 2
+            hit_tokens = stats.cached_prefix(prompt) // 2
+            completion_tokens = len(reply) // 2
+            stats.add(prompt_tokens=prompt_tokens, prompt_cache_hit_tokens=hit_tokens, completion_tokens=completion_tokens)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens,
+                     "prompt_cache_hit_tokens": hit_tokens,
+                     "prompt_cache_miss_tokens": prompt_tokens - hit_tokens}
+            if stream:
+                self.stream_reply(request.get("model", "mock"), reply, usage)
+                return
+            self.send_json(200, {
+                "id": "mock",
+                "object": "chat.completion",
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+    return Handler
+
+
+def start_server(options: Optional[MockOptions] = None, host: str = "127.0.0.1", port: int = 0):
+    """在后台线程启动模拟服务器，返回 (服务器, 接口URL, 统计)"""
+    stats = MockStats()
+    server = ThreadingHTTPServer((host, port), make_handler(options or MockOptions(), stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://{host}:{server.server_address[1]}/v1/chat/completions"
+    return server, url, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟的DeepSeek对话接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="延迟中位数（秒）")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="对数正态分布的sigma，越大长尾越明显")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回503的比例")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="返回429的比例")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="返回格式错误回复的比例")
+    parser.add_argument("--runaway-rate", type=float, default=0.0, help="返回失控（不断重复）回复的比例")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429响应中的Retry-After（秒）")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    options = MockOptions(args.latency, args.latency_sigma, args.error_rate, args.throttle_rate,
+                          args.malformed_rate, args.retry_after, args.seed, args.runaway_rate)
+    server, url, stats = start_server(options, args.host, args.port)
+    print(f"模拟接口: {url}（Ctrl+C 退出）")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(stats.as_dict())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import json
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+# 术语表中表示“保持原文，不要翻译”的值
+KEEP = None
+# 对未单独列出的语言生效的默认译法
+DEFAULT_LANGUAGE = "*"
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式匹配：一次扫描找出文本中出现的所有术语"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern)
+
+    def _build(self):
+        """按广度优先计算失败指针，并把失败指针指向状态的输出合并进来"""
+        # 根节点子节点的失败指针为根节点
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> Set[str]:
+        """返回文本中出现的所有模式"""
+        found = set()
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class GlossaryError(ValueError):
+    """术语表文件格式错误"""
+
+
+class Glossary:
+    """项目术语表：原文术语 -> 各语言的强制译法（None 表示保持原文不翻译）
+
+    文件格式（JSON）:
+        {
+            "勇者": {"english": "Hero", "japanese": "勇者"},
+            "Steam": null,
+            "金币": {"*": "Gold", "french": "Or", "german": null}
+        }
+    值为 null 时所有语言都保持原文；"*" 是未单独列出的语言使用的译法。
+    """
+
+    def __init__(self, terms: Optional[Dict[str, object]] = None, path: Optional[str] = None):
+        self.path = path
+        self.terms: Dict[str, object] = dict(terms or {})
+        self._matcher = AhoCorasick(self.terms)
+
+    @classmethod
+    def load(cls, path: str) -> "Glossary":
+        """读取术语表文件"""
+        try:
+            with open(path, 'r', encoding='utf-8-sig') as file:
+                data = json.load(file)
+        except ValueError as e:
+            raise GlossaryError(f"术语表 {path} 不是有效的JSON: {e}")
+        if not isinstance(data, dict):
+            raise GlossaryError(f"术语表 {path} 必须是JSON对象")
+        for term, value in data.items():
+            if value is not KEEP and not isinstance(value, dict):
+                raise GlossaryError(f"术语 {term!r} 的值必须是对象或 null")
+            if isinstance(value, dict):
+                for language, translation in value.items():
+                    if translation is not KEEP and not isinstance(translation, str):
+                        raise GlossaryError(f"术语 {term!r} 的 {language} 译法必须是字符串或 null")
+        return cls(data, path)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def rule(self, term: str, language: str):
+        """返回某个术语在某种语言中的规则：译法字符串、KEEP，或没有规则时返回 False"""
+        value = self.terms.get(term, False)
+        if value is KEEP:
+            return KEEP
+        if isinstance(value, dict):
+            if language in value:
+                return value[language]
+            return value.get(DEFAULT_LANGUAGE, False)
+        return False
+
+    def match(self, texts: Iterable[str], language: str) -> Dict[str, Optional[str]]:
+        """找出文本中出现且对该语言有规则的术语：{术语: 译法或 KEEP}"""
+        if not self.terms:
+            return {}
+        found = set()
+        for text in texts:
+            found |= self._matcher.find(text)
+        entries = {}
+        for term in sorted(found):
+            rule = self.rule(term, language)
+            if rule is not False:
+                entries[term] = rule
+        return entries
+
+    def violations(self, source: str, translation: str, language: str) -> List[str]:
+        """返回译文中没有按术语表处理的术语"""
+        if not self.terms:
+            return []
+        folded = translation.casefold()
+        violated = []
+        for term, rule in self.match([source], language).items():
+            expected = term if rule is KEEP else rule
+            if expected and expected.casefold() not in folded:
+                violated.append(term)
+        return violated
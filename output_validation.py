@@ -0,0 +1,123 @@
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from glossary import Glossary, KEEP
+
+# 需要原样保留的占位符：Steam富状态变量（%count%）、printf 格式（%s、%1$d）、
+# 花括号参数（{0}、{name}、{#Token}、{%var%}）、HTML标签（<br>）、Steam BBCode标签（[b]、[url=...]）以及字面的 \n、\t 转义
+# 富状态变量必须在 printf 格式之前匹配，否则 %count% 会被当成 %c
+PLACEHOLDER_RE = re.compile(
+    r'%[A-Za-z_][A-Za-z0-9_]*%'
+    r'|%(?:\d+\$)?[-+0#]*\d*(?:\.\d+)?[sdifuxXc%]'
+    r'|\{[#%]?[A-Za-z0-9_]*%?\}'
+    r'|</?[A-Za-z][^<>]*>'
+    r'|\[/?(?i:b|i|u|s|h[1-6]|url|img|list|olist|\*|quote|code|strike|spoiler|noparse|hr|table|tr|th|td)(?:=[^\]]*)?\]'
+    r'|\\[nt]'
+)
+
+# 汉字（CJK统一表意文字及扩展A）
+HAN_RE = re.compile(r'[㐀-䶿一-鿿]')
+
+# 模型在译文前附加的标签（只匹配单独的标签，"Translation task: done" 这样的正常译文不算）
+EXPLANATION_RE = re.compile(r'^\s*(?:翻译结果|翻译|译文|Translation|Translated text)\s*[:：]', re.IGNORECASE)
+
+# 译文中可以出现汉字的目标语言
+HAN_LANGUAGES = {"schinese", "tchinese", "japanese"}
+
+# 目标语言应使用的文字（Unicode范围），未列出的语言使用拉丁字母
+SCRIPTS: Dict[str, Tuple[Tuple[int, int], ...]] = {
+    "arabic": ((0x0600, 0x06FF), (0x0750, 0x077F), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)),
+    "bulgarian": ((0x0400, 0x04FF),),
+    "russian": ((0x0400, 0x04FF),),
+    "ukrainian": ((0x0400, 0x04FF),),
+    "greek": ((0x0370, 0x03FF), (0x1F00, 0x1FFF)),
+    "thai": ((0x0E00, 0x0E7F),),
+    "koreana": ((0x1100, 0x11FF), (0x3130, 0x318F), (0xAC00, 0xD7AF)),
+    "japanese": ((0x3040, 0x30FF), (0x3400, 0x4DBF), (0x4E00, 0x9FFF)),
+    "schinese": ((0x3400, 0x4DBF), (0x4E00, 0x9FFF)),
+    "tchinese": ((0x3400, 0x4DBF), (0x4E00, 0x9FFF)),
+}
+LATIN = ((0x0041, 0x005A), (0x0061, 0x007A), (0x00C0, 0x024F), (0x1E00, 0x1EFF))
+
+# 译文长度超过 原文长度 × MAX_LENGTH_RATIO + MAX_LENGTH_SLACK 时视为附加了解释
+MAX_LENGTH_RATIO = 6
+MAX_LENGTH_SLACK = 40
+
+
+def placeholders(text: str) -> Counter:
+    """统计文本中的占位符（BBCode标签不区分大小写）"""
+    return Counter(match.lower() if match.startswith('[') else match for match in PLACEHOLDER_RE.findall(text))
+
+
+def uses_script(text: Iterable[str], language: str) -> bool:
+    """文本中是否有目标语言所用文字的字符"""
+    ranges = SCRIPTS.get(language, LATIN)
+    return any(low <= ord(char) <= high for char in text for low, high in ranges)
+
+
+class OutputValidator:
+    """检查译文是否可以直接写入VDF：占位符一致、没有残留的中文原文、没有附加解释、
+    文字符合目标语言并遵守术语表"""
+
+    def __init__(self, glossary: Optional[Glossary] = None):
+        self.glossary = glossary or Glossary()
+
+    def check(self, source: str, translation: str, language: str) -> List[str]:
+        """返回译文的问题列表（没有问题时为空）"""
+        if not source.strip():
+            return []
+        if not translation.strip():
+            return ["译文为空"]
+
+        problems = []
+        expected, actual = placeholders(source), placeholders(translation)
+        if expected != actual:
+            missing = ", ".join(sorted((expected - actual).elements()))
+            extra = ", ".join(sorted((actual - expected).elements()))
+            problems.append("占位符不一致" + (f"，缺少 {missing}" if missing else "") + (f"，多出 {extra}" if extra else ""))
+
+        if language not in HAN_LANGUAGES and HAN_RE.search(source):
+            # 术语表规定的译法（包括保持原文的中文术语）不算残留，也不参与文字检查
+            remainder = translation
+            for term, rule in self.glossary.match([source], language).items():
+                remainder = remainder.replace(term if rule is KEEP else rule, "")
+            if HAN_RE.search(remainder):
+                problems.append("未翻译或残留中文")
+            else:
+                letters = [char for char in PLACEHOLDER_RE.sub("", remainder) if char.isalpha()]
+                if letters and not uses_script(letters, language):
+                    problems.append("文字不符合目标语言")
+
+        if (EXPLANATION_RE.match(translation) and not EXPLANATION_RE.match(source)) \
+                or translation.count("\n") > source.count("\n") \
+                or len(translation) > len(source) * MAX_LENGTH_RATIO + MAX_LENGTH_SLACK:
+            problems.append("包含多余的说明")
+
+        terms = self.glossary.violations(source, translation, language)
+        if terms:
+            problems.append(f"未按术语表处理: {', '.join(terms)}")
+        return problems
+
+
+if __name__ == "__main__":
+    # 占位符检查的自检：python output_validation.py
+    validator = OutputValidator()
+    cases = [
+        ('获得 %count% 个金币', 'Got %c coins', False),
+        ('获得 %count% 个金币', 'Got %count% coins', True),
+        ('{#Map_1} 中', 'In the map', False),
+        ('{#Map_1} 中', 'In {#Map_1}', True),
+        ('{%score%} 分', '{%score%} points', True),
+        ('得分 %score%，排名 %1$d', 'Score %s, rank %1$d', False),
+        ('完成 %d%%', 'Done %d%%', True),
+        ('你好 {0}', 'Hello {0}', True),
+        ('翻译任务：完成', 'Translation task: done', True),
+        ('这里是起点', 'Here is the start: go', True),
+        ('你好', 'Translation: Hello', False),
+        ('你好', '翻译结果：Hello', False),
+    ]
+    for source, translation, ok in cases:
+        problems = validator.check(source, translation, "english")
+        assert (not problems) == ok, (source, translation, problems)
+    print(f"{len(cases)} 项检查通过")
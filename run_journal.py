@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class RunJournal:
+    """只追加的翻译运行日志（JSON Lines）：
+    第一行是运行信息，之后每行一条已完成结果 [语言, 键, 原文指纹, 译文]，
+    程序崩溃或被关闭后可以据此恢复，只重新翻译缺失的部分"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def exists(self) -> bool:
+        """日志文件是否存在"""
+        return os.path.exists(self.path)
+
+    def start(self, header: dict):
+        """开始新的运行（覆盖旧日志）"""
+        with self._lock:
+            self._close()
+            self._file = open(self.path, 'w', encoding='utf-8', newline='\n')
+            self._file.write(json.dumps(header, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+    def resume(self):
+        """继续追加到已有日志（先去掉崩溃时写了一半的最后一行，否则新记录会接在它后面而无法读取）"""
+        with self._lock:
+            self._close()
+            self._truncate_partial_line()
+            self._file = open(self.path, 'a', encoding='utf-8', newline='\n')
+
+    def _truncate_partial_line(self):
+        """把日志截断到最后一个换行符之后"""
+        if not self.exists():
+            return
+        with open(self.path, 'rb+') as file:
+            end = file.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - 4096)
+                file.seek(start)
+                newline = file.read(position - start).rfind(b'\n')
+                if newline != -1:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position < end:
+                file.truncate(position)
+
+    def record(self, language: str, entries: Iterable[Tuple[str, str, str]]):
+        """追加一组 (键, 原文指纹, 译文) 结果"""
+        lines = ''.join(json.dumps([language, key, fingerprint, translation], ensure_ascii=False) + '\n'
+                        for key, fingerprint, translation in entries)
+        if not lines:
+            return
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(lines)
+            self._file.flush()
+
+    def load(self) -> Tuple[Optional[dict], Dict[str, Dict[str, Tuple[str, str]]]]:
+        """读取日志，返回 (运行信息, {语言: {键: (原文指纹, 译文)}})，忽略崩溃时写了一半的行"""
+        header = None
+        entries: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        if not self.exists():
+            return header, entries
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(data, dict):
+                    header = data
+                elif isinstance(data, list) and len(data) == 4:
+                    language, key, fingerprint, translation = data
+                    entries.setdefault(language, {})[key] = (fingerprint, translation)
+        return header, entries
+
+    def compact(self, keep_languages: Iterable[str]):
+        """只保留指定语言的结果（每个键只保留最后一条），重写日志"""
+        keep = set(keep_languages)
+        with self._lock:
+            self._close()
+        header, entries = self.load()
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8', newline='\n') as file:
+            if header is not None:
+                file.write(json.dumps(header, ensure_ascii=False) + '\n')
+            for language in keep:
+                for key, (fingerprint, translation) in entries.get(language, {}).items():
+                    file.write(json.dumps([language, key, fingerprint, translation], ensure_ascii=False) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+
+    def remove(self):
+        """运行成功结束后删除日志"""
+        with self._lock:
+            self._close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def close(self):
+        """关闭日志文件"""
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
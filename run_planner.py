@@ -0,0 +1,144 @@
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+from run_telemetry import RunTelemetry
+
+# DeepSeek 官方给出的换算：1 个英文字符约 0.3 个token，1 个中文字符约 0.6 个token
+ASCII_TOKENS_PER_CHAR = 0.3
+CJK_TOKENS_PER_CHAR = 0.6
+# 其他文字（西里尔、希腊、泰文、阿拉伯文及带变音符号的拉丁字母）按经验取中间值
+OTHER_TOKENS_PER_CHAR = 0.5
+
+# 译文tokens与中文原文tokens之比（经验值），未列出的语言使用 DEFAULT_EXPANSION
+OUTPUT_EXPANSION = {
+    "schinese": 1.0, "tchinese": 1.0, "japanese": 1.2, "koreana": 1.3,
+    "russian": 2.2, "ukrainian": 2.2, "bulgarian": 2.2, "greek": 2.4,
+    "thai": 2.4, "arabic": 2.0, "vietnamese": 1.8,
+}
+DEFAULT_EXPANSION = 1.5
+
+# DeepSeek 上下文硬盘缓存以 64 tokens 为单位命中相同的提示词前缀
+CACHE_UNIT_TOKENS = 64
+
+# 耗时估算：首个token的等待时间（秒）和生成速度（tokens/秒）
+FIRST_TOKEN_SECONDS = 1.0
+OUTPUT_TOKENS_PER_SECOND = 40.0
+
+
+def estimate_tokens(text: str) -> int:
+    """按字符类别估算文本的token数（不需要分词器）"""
+    total = 0.0
+    for char in text:
+        if ord(char) < 128:
+            total += ASCII_TOKENS_PER_CHAR
+        elif unicodedata.east_asian_width(char) in ('W', 'F'):
+            total += CJK_TOKENS_PER_CHAR
+        else:
+            total += OTHER_TOKENS_PER_CHAR
+    return int(total + 0.999)
+
+
+def estimate_output_tokens(texts: Iterable[str], language: str) -> int:
+    """估算把原文翻译成某种语言后译文的token数"""
+    return int(sum(estimate_tokens(text) for text in texts) * OUTPUT_EXPANSION.get(language, DEFAULT_EXPANSION) + 0.999)
+
+
+def _display_width(text: str) -> int:
+    return sum(2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1 for char in text)
+
+
+def _pad(text: str, width: int, right: bool = True) -> str:
+    padding = " " * max(0, width - _display_width(text))
+    return padding + text if right else text + padding
+
+
+class RunPlan:
+    """一次翻译的预估：每种语言需要翻译的条目、请求数、tokens和费用，以及按并发数估算的总耗时"""
+
+    COLUMNS = (
+        ("language", "语言"), ("changed", "待翻译"), ("unique", "去重后"), ("cached", "缓存命中"),
+        ("requests", "请求数"), ("prompt_tokens", "输入tokens"), ("prompt_cache_hit_tokens", "缓存tokens"),
+        ("completion_tokens", "输出tokens"), ("cost_usd", "费用($)"),
+    )
+
+    def __init__(self, prices: Optional[Dict[str, float]] = None, max_workers: int = 4):
+        # 费用按运行统计的同一套价格计算
+        self.pricing = RunTelemetry(prices)
+        self.max_workers = max(1, max_workers)
+        self.languages: Dict[str, dict] = {}
+        self.request_seconds: List[float] = []
+        self.requests = 0
+
+    def add_language(self, language: str, name: str, changed: int, unique: int, cached: int):
+        self.languages[language] = {
+            "language": language, "name": name, "changed": changed, "unique": unique, "cached": cached,
+            "requests": 0.0, "prompt_tokens": 0.0, "prompt_cache_hit_tokens": 0.0, "completion_tokens": 0.0,
+            "cost_usd": 0.0,
+        }
+
+    def add_request(self, languages: List[str], prompt_tokens: int, cache_hit_tokens: int, completion_tokens: int):
+        """记录一个预计的请求，多语言请求的用量平均分摊到各语言"""
+        cost = self.pricing.cost({"prompt_tokens": prompt_tokens, "prompt_cache_hit_tokens": cache_hit_tokens,
+                                  "completion_tokens": completion_tokens})
+        share = 1.0 / len(languages)
+        for language in languages:
+            row = self.languages[language]
+            row["requests"] += share
+            row["prompt_tokens"] += prompt_tokens * share
+            row["prompt_cache_hit_tokens"] += cache_hit_tokens * share
+            row["completion_tokens"] += completion_tokens * share
+            row["cost_usd"] += cost * share
+        self.requests += 1
+        self.request_seconds.append(FIRST_TOKEN_SECONDS + completion_tokens / OUTPUT_TOKENS_PER_SECOND)
+
+    def wall_seconds(self) -> float:
+        """按并发数估算总耗时：总请求时间平均分给各并发，且不少于最慢的单个请求"""
+        if not self.request_seconds:
+            return 0.0
+        return max(sum(self.request_seconds) / self.max_workers, max(self.request_seconds))
+
+    def totals(self) -> dict:
+        total = {name: 0.0 for name, _ in self.COLUMNS[1:]}
+        for row in self.languages.values():
+            for name in total:
+                total[name] += row[name]
+        total["requests"] = self.requests
+        return total
+
+    def as_dict(self) -> dict:
+        """以字典形式返回（数值已取整），用于命令行的JSON输出"""
+        def rounded(row: dict) -> dict:
+            return {name: (round(value, 6) if name == "cost_usd" else round(value) if isinstance(value, float) else value)
+                    for name, value in row.items()}
+        return {
+            "languages": [rounded(row) for row in self.languages.values()],
+            "total": dict(rounded(self.totals()), wall_seconds=round(self.wall_seconds(), 1), max_workers=self.max_workers),
+        }
+
+    def rows(self) -> List[List[str]]:
+        """表格各行的文本（含表头和合计行）"""
+        def cells(label: str, row: dict) -> List[str]:
+            values = [label]
+            for name, _ in self.COLUMNS[1:]:
+                value = row[name]
+                values.append(f"{value:.4f}" if name == "cost_usd" else f"{round(value)}")
+            return values
+        lines = [[title for _, title in self.COLUMNS]]
+        lines += [cells(row["name"], row) for row in self.languages.values()]
+        lines.append(cells("合计", self.totals()))
+        return lines
+
+    def table_lines(self) -> List[str]:
+        """对齐后的表格（中文按两个字符宽度计算），最后一行为预计耗时"""
+        rows = self.rows()
+        widths = [max(_display_width(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = ["  ".join(_pad(cell, widths[i], right=i > 0) for i, cell in enumerate(row)) for row in rows]
+        lines.append(self.summary_message())
+        return lines
+
+    def summary_message(self) -> str:
+        total = self.totals()
+        minutes, seconds = divmod(int(self.wall_seconds() + 0.5), 60)
+        return (f"预计 {self.requests} 次请求，输入约 {round(total['prompt_tokens'])} tokens"
+                f"（缓存命中约 {round(total['prompt_cache_hit_tokens'])}），输出约 {round(total['completion_tokens'])} tokens，"
+                f"费用约 ${total['cost_usd']:.4f}，并发 {self.max_workers} 时约需 {minutes} 分 {seconds} 秒")
@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+# DeepSeek deepseek-chat 默认价格（美元 / 百万tokens），可在配置文件 [Telemetry] 中修改
+DEFAULT_PRICES = {
+    "input_cache_hit": 0.028,
+    "input_cache_miss": 0.28,
+    "output": 0.42,
+}
+
+# 按语言累计的计数器
+COUNTERS = (
+    "requests", "failed_requests", "retries", "hedged_requests",
+    "prompt_tokens", "completion_tokens", "prompt_cache_hit_tokens", "prompt_cache_miss_tokens",
+    "bytes_sent", "bytes_received", "cost_usd",
+)
+
+
+def _new_counters() -> Dict[str, float]:
+    return {name: 0 for name in COUNTERS}
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """计算分位数（最近秩法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(fraction * len(ordered) + 0.5) - 1))]
+
+
+class RunTelemetry:
+    """记录一次运行中每个API请求的延迟、重试次数、token用量（含上下文缓存命中）、流量和费用，
+    按语言和整次运行汇总，并导出为JSON报告和Prometheus文本文件"""
+
+    def __init__(self, prices: Optional[Dict[str, float]] = None):
+        self.prices = dict(DEFAULT_PRICES, **(prices or {}))
+        self.started = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+        self._languages: Dict[str, Dict[str, float]] = {}
+        self._latencies: Dict[str, List[float]] = {}
+
+    def cost(self, usage: dict) -> float:
+        """根据usage计算费用（美元）"""
+        prompt = usage.get('prompt_tokens', 0) or 0
+        hit = usage.get('prompt_cache_hit_tokens', 0) or 0
+        miss = usage.get('prompt_cache_miss_tokens', prompt - hit) or 0
+        completion = usage.get('completion_tokens', 0) or 0
+        return (hit * self.prices["input_cache_hit"] + miss * self.prices["input_cache_miss"]
+                + completion * self.prices["output"]) / 1_000_000
+
+    def record(self, languages: Iterable[str], latency: float, call: dict, usage: Optional[dict], ok: bool = True):
+        """记录一次API调用：call 为传输层填写的 attempts / bytes_sent / bytes_received / hedged，
+        多语言请求的用量和费用平均分摊到各语言"""
+        languages = list(languages) or ["unknown"]
+        usage = usage or {}
+        prompt = usage.get('prompt_tokens', 0) or 0
+        hit = usage.get('prompt_cache_hit_tokens', 0) or 0
+        values = {
+            "requests": 1,
+            "failed_requests": 0 if ok else 1,
+            # 对冲请求不算重试
+            "retries": max(0, call.get('attempts', 1) - 1 - (1 if call.get('hedged') else 0)),
+            "hedged_requests": 1 if call.get('hedged') else 0,
+            "prompt_tokens": prompt,
+            "completion_tokens": usage.get('completion_tokens', 0) or 0,
+            "prompt_cache_hit_tokens": hit,
+            "prompt_cache_miss_tokens": usage.get('prompt_cache_miss_tokens', prompt - hit) or 0,
+            "bytes_sent": call.get('bytes_sent', 0),
+            "bytes_received": call.get('bytes_received', 0),
+            "cost_usd": self.cost(usage),
+        }
+        share = 1.0 / len(languages)
+        with self._lock:
+            for language in languages:
+                counters = self._languages.setdefault(language, _new_counters())
+                for name, value in values.items():
+                    counters[name] += value * share
+                self._latencies.setdefault(language, []).append(latency)
+
+    def finish(self):
+        """标记运行结束"""
+        self.finished = time.time()
+
+    def summary(self) -> dict:
+        """汇总为 {run: {...}, languages: {语言: {...}}}"""
+        with self._lock:
+            languages = {}
+            total = _new_counters()
+            all_latencies = []
+            for language, counters in self._languages.items():
+                latencies = self._latencies.get(language, [])
+                all_latencies.extend(latencies)
+                languages[language] = self._describe(counters, latencies)
+                for name, value in counters.items():
+                    total[name] += value
+        finished = self.finished or time.time()
+        run = self._describe(total, all_latencies)
+        run.update(started=self.started, finished=finished, duration_seconds=round(finished - self.started, 3))
+        return {"run": run, "languages": languages, "prices_usd_per_million": self.prices}
+
+    @staticmethod
+    def _describe(counters: Dict[str, float], latencies: List[float]) -> dict:
+        result = {name: (round(value, 6) if name == "cost_usd" else round(value)) for name, value in counters.items()}
+        prompt = counters["prompt_tokens"]
+        result.update(
+            cache_hit_rate=round(counters["prompt_cache_hit_tokens"] / prompt, 4) if prompt else 0.0,
+            latency_p50=round(percentile(latencies, 0.50), 4),
+            latency_p95=round(percentile(latencies, 0.95), 4),
+            latency_p99=round(percentile(latencies, 0.99), 4),
+            latency_sum=round(sum(latencies), 4),
+        )
+        return result
+
+    def summary_message(self) -> str:
+        """返回用于日志显示的一行汇总"""
+        run = self.summary()["run"]
+        return (f"API请求: {run['requests']} 次（失败 {run['failed_requests']}, 重试 {run['retries']}, "
+                f"对冲 {run['hedged_requests']}）, "
+                f"输入 {run['prompt_tokens']} tokens（上下文缓存命中 {run['prompt_cache_hit_tokens']}, "
+                f"{run['cache_hit_rate'] * 100:.1f}%）, "
+                f"输出 {run['completion_tokens']} tokens, 费用约 ${run['cost_usd']:.4f}, "
+                f"延迟 p50 {run['latency_p50']:.2f}s / p99 {run['latency_p99']:.2f}s")
+
+    def language_messages(self, names: Optional[Dict[str, str]] = None) -> List[str]:
+        """返回每种语言一行的用量统计（输入tokens、上下文缓存命中和费用）"""
+        names = names or {}
+        return [f"{names.get(language, language)}: 请求 {values['requests']} 次, 输入 {values['prompt_tokens']} tokens, "
+                f"缓存命中 {values['prompt_cache_hit_tokens']} ({values['cache_hit_rate'] * 100:.1f}%), "
+                f"输出 {values['completion_tokens']} tokens, 费用约 ${values['cost_usd']:.4f}"
+                for language, values in sorted(self.summary()["languages"].items())]
+
+    def prometheus_text(self, labels: Optional[Dict[str, str]] = None) -> str:
+        """生成Prometheus文本格式（node_exporter textfile collector）"""
+        summary = self.summary()
+        base = dict(labels or {})
+
+        def format_labels(extra: Dict[str, str]) -> str:
+            merged = dict(base, **extra)
+            return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in merged.items()) + "}"
+
+        lines = []
+        for name in COUNTERS:
+            metric = f"vdf_translator_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for language, values in sorted(summary["languages"].items()):
+                lines.append(f"{metric}{format_labels({'language': language})} {values[name]}")
+        metric = "vdf_translator_request_latency_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for language, values in sorted(summary["languages"].items()):
+            for quantile in ("0.5", "0.95", "0.99"):
+                key = {"0.5": "latency_p50", "0.95": "latency_p95", "0.99": "latency_p99"}[quantile]
+                lines.append(f"{metric}{format_labels({'language': language, 'quantile': quantile})} {values[key]}")
+            lines.append(f"{metric}_sum{format_labels({'language': language})} {values['latency_sum']}")
+            lines.append(f"{metric}_count{format_labels({'language': language})} {values['requests']}")
+        lines.append("# TYPE vdf_translator_run_duration_seconds gauge")
+        lines.append(f"vdf_translator_run_duration_seconds{format_labels({})} {summary['run']['duration_seconds']}")
+        lines.append("# TYPE vdf_translator_run_finished_timestamp_seconds gauge")
+        lines.append(f"vdf_translator_run_finished_timestamp_seconds{format_labels({})} {round(summary['run']['finished'], 3)}")
+        return "\n".join(lines) + "\n"
+
+    def write_reports(self, json_path: str, prom_path: str, labels: Optional[Dict[str, str]] = None):
+        """写出JSON报告和Prometheus文本文件（先写临时文件再替换）"""
+        report = self.summary()
+        report["labels"] = dict(labels or {})
+        _write_atomic(json_path, json.dumps(report, ensure_ascii=False, indent=1))
+        _write_atomic(prom_path, self.prometheus_text(labels))
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomic(path: str, text: str):
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8', newline='\n') as file:
+        file.write(text)
+    os.replace(temp_path, path)
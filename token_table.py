@@ -0,0 +1,145 @@
+import json
+from json.encoder import encode_basestring, encode_basestring_ascii
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+
+class TokenTable(Mapping):
+    """一个源文件的全部文本（按列存放）：键和原文只保存一份并按位置编号，
+    各语言的译文、完成标记和原文指纹清单都是与键位置对应的列，多种语言同时翻译时不复制键和原文。
+    作为 键 -> 原文 的映射可以代替 tokens 字典使用（保持源文件顺序，重复的键以最后一次出现的值为准）"""
+
+    def __init__(self, pairs: Iterable[Tuple[str, str]], fingerprint: Callable[[str], str],
+                 conditions: Optional[Dict[str, str]] = None):
+        self._keys: List[str] = []
+        self._sources: List[str] = []
+        self._index: Dict[str, int] = {}
+        for key, value in pairs:
+            position = self._index.get(key)
+            if position is None:
+                self._index[key] = len(self._keys)
+                self._keys.append(key)
+                self._sources.append(value)
+            else:
+                self._sources[position] = value
+        self._fingerprint = fingerprint
+        # 键 -> 源文件中的条件（如 $WIN32），只记录带条件的键，写出译文时原样保留
+        self.conditions: Dict[str, str] = conditions or {}
+        self._fingerprints: Optional[List[str]] = None
+        # 写出清单用：按键排序后的位置和已编码的键
+        self._sorted: Optional[List[Tuple[int, str]]] = None
+        # 语言 -> 译文列（None 表示没有译文）和完成标记列（1 表示译文对应当前原文）
+        self._values: Dict[str, List[Optional[str]]] = {}
+        self._done: Dict[str, bytearray] = {}
+        # 语言 -> 原文指纹清单列（与当前原文一致的指纹直接引用原文指纹列中的同一个字符串）
+        self._manifest: Dict[str, List[Optional[str]]] = {}
+
+    def __getitem__(self, key: str) -> str:
+        return self._sources[self._index[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def _fingerprint_column(self) -> List[str]:
+        """所有原文的指纹（首次使用时计算一次，所有语言共用）"""
+        if self._fingerprints is None:
+            self._fingerprints = [self._fingerprint(value) for value in self._sources]
+        return self._fingerprints
+
+    def fingerprint(self, key: str) -> str:
+        """键当前原文的指纹"""
+        return self._fingerprint_column()[self._index[key]]
+
+    def add_language(self, language: str):
+        """为一种语言添加空的译文列"""
+        self._values[language] = [None] * len(self._keys)
+        self._done[language] = bytearray(len(self._keys))
+
+    def has_language(self, language: str) -> bool:
+        return language in self._values
+
+    def drop_language(self, language: str):
+        """释放一种语言的译文列（原文指纹清单保留）"""
+        self._values.pop(language, None)
+        self._done.pop(language, None)
+
+    def set_translation(self, language: str, key: str, value: str, done: bool = True):
+        """写入译文，done 为假表示这是旧原文的译文（原文已修改，等待重新翻译）"""
+        position = self._index[key]
+        self._values[language][position] = value
+        self._done[language][position] = done
+
+    def record(self, language: str, translated: Dict[str, str]):
+        """写入一批新翻译的结果"""
+        values, done = self._values[language], self._done[language]
+        for key, value in translated.items():
+            position = self._index[key]
+            values[position] = value
+            done[position] = True
+
+    def translation(self, language: str, key: str) -> Optional[str]:
+        return self._values[language][self._index[key]]
+
+    def translated_items(self, language: str) -> Iterator[Tuple[str, str]]:
+        """按源文件顺序产生有译文的 (键, 译文)，供写出文件时流式使用"""
+        for key, value in zip(self._keys, self._values[language]):
+            if value is not None:
+                yield key, value
+
+    def manifest_fingerprint(self, language: str, key: str) -> Optional[str]:
+        """原文指纹清单中记录的、该语言译文对应的原文指纹"""
+        column = self._manifest.get(language)
+        return column[self._index[key]] if column is not None else None
+
+    def has_manifest(self, language: str) -> bool:
+        """原文指纹清单中是否有该语言的记录"""
+        return language in self._manifest
+
+    def commit_fingerprints(self, language: str):
+        """保存译文文件后更新该语言的原文指纹清单：已完成的键记录当前原文指纹，
+        尚未完成但保留了旧译文的键沿用旧指纹，没有译文的键不记录"""
+        fingerprints = self._fingerprint_column()
+        old = self._manifest.get(language) or [None] * len(self._keys)
+        self._manifest[language] = [
+            (fingerprints[i] if done else old[i]) if value is not None else None
+            for i, (value, done) in enumerate(zip(self._values[language], self._done[language]))
+        ]
+
+    def read_manifest(self, file: TextIO):
+        """读取原文指纹清单 {语言: {键: 原文指纹}}：每种语言解析完立即转换为列，
+        不在内存中保留整个清单；源文件中已不存在的键被忽略"""
+        fingerprints = self._fingerprint_column()
+
+        def to_column(pairs):
+            if pairs and isinstance(pairs[0][1], list):
+                return dict(pairs)
+            column = [None] * len(self._keys)
+            for key, value in pairs:
+                position = self._index.get(key)
+                if position is not None and isinstance(value, str):
+                    # 与当前原文一致时引用共用的指纹字符串
+                    column[position] = fingerprints[position] if value == fingerprints[position] else value
+            return column
+
+        manifest = json.load(file, object_pairs_hook=to_column)
+        self._manifest = manifest if isinstance(manifest, dict) else {}
+
+    def write_manifest(self, file: TextIO):
+        """写出原文指纹清单（格式与 json.dump(indent=1, sort_keys=True) 相同），逐项写出不构造字典"""
+        if self._sorted is None:
+            self._sorted = [(position, "\n  " + encode_basestring(self._keys[position]) + ": ")
+                            for position in sorted(range(len(self._keys)), key=self._keys.__getitem__)]
+        file.write("{")
+        for n, language in enumerate(sorted(self._manifest)):
+            column = self._manifest[language]
+            entries = ",".join(prefix + encode_basestring_ascii(column[position])
+                               for position, prefix in self._sorted if column[position] is not None)
+            file.write(("," if n else "") + "\n " + encode_basestring(language) + ": {"
+                       + (entries + "\n }" if entries else "}"))
+        file.write("}" if not self._manifest else "\n}")
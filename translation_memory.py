@@ -0,0 +1,144 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Sequence, Union
+
+
+class TranslationMemory:
+    """基于SQLite的本地翻译记忆库，按 原文 + 目标语言 + 模型 + 提示词版本 缓存翻译结果"""
+
+    # 单条SQL语句中最多使用的参数数量
+    CHUNK_SIZE = 500
+    # 每写入多少条记录检查一次容量
+    TRIM_INTERVAL = 1000
+
+    def __init__(self, db_path: str, max_entries: int = 200000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_trim = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, language TEXT NOT NULL, translation TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_language ON translations (language)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, language: str, namespace: str) -> str:
+        """计算缓存键（namespace 包含模型名称和提示词版本）"""
+        raw = "\0".join((namespace, language, text))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get_many(self, texts: Iterable[str], language: str, namespace: Union[str, Sequence[str]]) -> Dict[str, str]:
+        """批量查询缓存，返回 原文 -> 译文 的映射（只包含命中的项）；
+        namespace 可以是按优先顺序排列的多个命名空间，同一原文取排在最前的命中"""
+        return self._lookup(texts, language, namespace, touch=True)
+
+    def peek_many(self, texts: Iterable[str], language: str, namespace: Union[str, Sequence[str]]) -> Dict[str, str]:
+        """与 get_many 相同，但不更新最近使用时间和命中统计（用于运行前的估算）"""
+        return self._lookup(texts, language, namespace, touch=False)
+
+    def _lookup(self, texts: Iterable[str], language: str, namespace: Union[str, Sequence[str]], touch: bool) -> Dict[str, str]:
+        namespaces = [namespace] if isinstance(namespace, str) else list(namespace)
+        texts = set(texts)
+        # 缓存键 -> (原文, 命名空间的优先顺序)
+        key_to_text = {self.make_key(text, language, name): (text, rank)
+                       for rank, name in enumerate(namespaces) for text in texts}
+        found = {}
+        ranks = {}
+        keys = list(key_to_text)
+        with self._lock:
+            for i in range(0, len(keys), self.CHUNK_SIZE):
+                chunk = keys[i:i + self.CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, translation FROM translations WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, translation in rows:
+                    text, rank = key_to_text[key]
+                    if rank < ranks.get(text, len(namespaces)):
+                        found[text] = translation
+                        ranks[text] = rank
+                if rows and touch:
+                    self._conn.execute(
+                        f"UPDATE translations SET last_used = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time()] + [key for key, _ in rows]
+                    )
+            if touch:
+                self._conn.commit()
+                self.hits += len(found)
+                self.misses += len(texts) - len(found)
+        return found
+
+    def get(self, text: str, language: str, namespace: Union[str, Sequence[str]]):
+        """查询单条缓存，未命中返回None"""
+        return self.get_many([text], language, namespace).get(text)
+
+    def put_many(self, translations: Dict[str, str], language: str, namespace: str):
+        """写入一组 原文 -> 译文 的翻译结果"""
+        if not translations:
+            return
+        now = time.time()
+        # 译文以UTF-8字节绑定再转换为文本：直接绑定str时CPython会在字符串对象上缓存一份UTF-8副本，
+        # 这些译文在翻译结束前一直被保留，会使其内存占用翻倍
+        rows = [(self.make_key(text, language, namespace), language, translated.encode('utf-8'), now)
+                for text, translated in translations.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (key, language, translation, last_used) VALUES (?, ?, CAST(? AS TEXT), ?)", rows
+            )
+            self._conn.commit()
+            self._puts_since_trim += len(rows)
+            if self._puts_since_trim >= self.TRIM_INTERVAL:
+                self._trim()
+
+    def put(self, text: str, translated: str, language: str, namespace: str):
+        """写入单条翻译结果"""
+        self.put_many({text: translated}, language, namespace)
+
+    def _trim(self):
+        """超出容量时淘汰最久未使用的记录（调用方需持有锁）"""
+        self._puts_since_trim = 0
+        count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM translations WHERE key IN (SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+            self._conn.commit()
+
+    def trim(self):
+        """立即检查容量并淘汰多余记录"""
+        with self._lock:
+            self._trim()
+
+    def invalidate(self, language: str) -> int:
+        """清除某种语言的全部缓存，返回删除的记录数"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM translations WHERE language = ?", (language,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def reset_stats(self):
+        """重置命中统计"""
+        self.hits = 0
+        self.misses = 0
+
+    def stats_message(self) -> str:
+        """返回用于日志显示的命中统计"""
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return f"翻译缓存: 命中 {self.hits}, 未命中 {self.misses}, 命中率 {rate:.1f}%"
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,230 @@
+"""命令行批量翻译：不需要图形界面，一次处理一个目录（或通配符匹配）中的所有源VDF文件
+
+用法示例:
+    python vdf_cli.py ./loc -l english,japanese,koreana
+    python vdf_cli.py "build/*_loc_schinese.vdf" -l all -o ./out --workers 8
+    python vdf_cli.py ./loc -l all --plan
+
+标准输出每行一个JSON事件（file_start / progress / language / file_done / summary），
+日志输出到标准错误。任意语言翻译失败时退出码为 1，被中断时为 130。
+使用 --plan 时不调用API，只估算每个文件的请求数、tokens、费用和耗时（每个文件一个 plan 事件）。
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import List, Optional
+
+from vdf_translator import DEFAULT_CONFIG_FILE, STEAM_LANGUAGES, VDFTranslator
+
+# 目录参数默认匹配的源文件
+DEFAULT_PATTERN = "*_loc_schinese.vdf"
+# 同时处理的源文件数量（任务共用同一个线程池，多一个文件可以在上一个文件收尾时保持线程池繁忙）
+FILES_IN_FLIGHT = 2
+
+
+class CLITranslator(VDFTranslator):
+    """命令行版本：日志写到标准错误，进度以JSON事件写到标准输出"""
+
+    def __init__(self, config_file: str = DEFAULT_CONFIG_FILE):
+        super().__init__(config_file)
+        self.label = ""
+        self.workers = []
+        self._output_lock = threading.Lock()
+        self._last_progress = -1
+
+    def fork(self, label: str = "") -> "CLITranslator":
+        worker = super().fork()
+        worker.label = label
+        worker._last_progress = -1
+        self.workers.append(worker)
+        return worker
+
+    def cancel_translation(self):
+        super().cancel_translation()
+        for worker in self.workers:
+            worker.translation_cancelled = True
+
+    def emit(self, event: str, **fields):
+        """向标准输出写一行JSON事件"""
+        line = json.dumps(dict(event=event, time=round(time.time(), 3), **fields), ensure_ascii=False)
+        with self._output_lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    def log_message(self, message):
+        prefix = f"[{self.label}] " if self.label else ""
+        with self._output_lock:
+            sys.stderr.write(prefix + str(message).strip("\n") + "\n")
+            sys.stderr.flush()
+
+    def set_progress_value(self, value):
+        # 只在整数百分比变化时输出，避免刷屏
+        percent = int(value)
+        if percent != self._last_progress:
+            self._last_progress = percent
+            self.emit("progress", file=self.label, percent=percent)
+
+
+def find_sources(patterns: List[str], pattern: str = DEFAULT_PATTERN) -> List[str]:
+    """把目录、通配符和文件参数展开为排序去重后的源文件列表"""
+    sources = []
+    for item in patterns:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, pattern))
+        elif glob.has_magic(item):
+            matches = glob.glob(item)
+        else:
+            matches = [item] if os.path.isfile(item) else []
+        sources.extend(os.path.abspath(path) for path in matches if os.path.isfile(path))
+    return sorted(set(sources))
+
+
+def parse_languages(value: str) -> List[str]:
+    """解析逗号分隔的语言代码列表，all 表示除简体中文外的全部语言"""
+    if value.strip().lower() == "all":
+        return [lang for lang in STEAM_LANGUAGES if lang != "schinese"]
+    languages = [lang.strip() for lang in value.split(",") if lang.strip()]
+    unknown = [lang for lang in languages if lang not in STEAM_LANGUAGES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"未知的语言代码: {', '.join(unknown)}")
+    return languages
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="使用DeepSeek API批量翻译Steam本地化VDF文件（无界面）")
+    parser.add_argument("sources", nargs="+", help="源VDF文件、目录或通配符")
+    parser.add_argument("-l", "--languages", required=True, type=parse_languages,
+                        help="目标语言代码，逗号分隔（例如 english,japanese），all 表示全部")
+    parser.add_argument("-o", "--output-dir", help="输出目录（默认与源文件相同）")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN, help=f"目录中匹配源文件的模式（默认 {DEFAULT_PATTERN}）")
+    parser.add_argument("--api-key", help="DeepSeek API密钥（默认读取环境变量 DEEPSEEK_API_KEY 或配置文件）")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_FILE, help="配置文件路径")
+    parser.add_argument("--batch-size", type=int, help="每次请求包含的文本项数量")
+    parser.add_argument("--workers", type=int, help="同时进行的翻译请求数量")
+    parser.add_argument("--full", action="store_true", help="重新翻译全部文本（关闭增量翻译）")
+    parser.add_argument("--multi-target", action="store_true", help="一次请求同时翻译成所有目标语言")
+    parser.add_argument("--resume", action="store_true", help="输出目录中有运行日志时继续上次未完成的翻译")
+    parser.add_argument("--plan", action="store_true", help="不翻译，只估算请求数、tokens、费用和耗时（不需要API密钥）")
+    parser.add_argument("--glossary", help="术语表JSON文件（默认查找源文件目录中的 <ID>_glossary.json 或 glossary.json）")
+    return parser
+
+
+def translate_source(translator: CLITranslator, source_file: str, output_dir: str, languages: List[str], resume: bool) -> dict:
+    """翻译单个源文件，返回 {语言: 状态}"""
+    worker = translator.fork(translator.get_base_id(source_file))
+    run_languages, resume_run = languages, False
+    if resume:
+        # 有运行日志时使用日志中记录的语言继续，否则正常开始
+        journal_languages = worker.get_resume_languages(source_file, output_dir)
+        if journal_languages:
+            run_languages, resume_run = journal_languages, True
+    worker.emit("file_start", file=worker.label, source=source_file, languages=run_languages, resume=resume_run)
+    try:
+        statuses = worker.translate_file(source_file, output_dir, run_languages, resume=resume_run)
+    except Exception as e:
+        worker.log_message(f"翻译过程中出错: {e}")
+        statuses = {lang: "failed" for lang in run_languages}
+    for lang, status in statuses.items():
+        worker.emit("language", file=worker.label, language=lang, status=status)
+    worker.emit("file_done", file=worker.label, source=source_file,
+                completed=sum(1 for status in statuses.values() if status == "completed"),
+                incomplete=sum(1 for status in statuses.values() if status == "incomplete"),
+                failed=sum(1 for status in statuses.values() if status == "failed"))
+    return statuses
+
+
+def plan_sources(translator: CLITranslator, sources: List[str], output_dir: Optional[str], languages: List[str]) -> int:
+    """估算每个源文件的翻译用量，表格写到标准错误，结果以 plan 事件写到标准输出"""
+    for source in sources:
+        label = translator.get_base_id(source)
+        try:
+            plan = translator.plan_file(source, output_dir or os.path.dirname(source), languages)
+        except Exception as e:
+            translator.log_message(f"[{label}] 估算时出错: {e}")
+            return 1
+        translator.log_message(f"[{label}] {source}")
+        for line in plan.table_lines():
+            translator.log_message(line)
+        translator.emit("plan", file=label, source=source, **plan.as_dict())
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    translator = CLITranslator(args.config)
+    translator.api_key = args.api_key or os.environ.get("DEEPSEEK_API_KEY") or translator.api_key
+    if not translator.api_key and not args.plan:
+        translator.log_message("缺少API密钥：请使用 --api-key、环境变量 DEEPSEEK_API_KEY 或在图形界面中保存密钥")
+        return 2
+    if args.batch_size is not None:
+        translator.batch_size = max(1, args.batch_size)
+    if args.workers is not None:
+        translator.max_workers = max(1, args.workers)
+    if args.full:
+        translator.incremental = False
+    if args.multi_target:
+        translator.multi_target = True
+    if args.glossary:
+        translator.glossary_file = args.glossary
+
+    sources = find_sources(args.sources, args.pattern)
+    if not sources:
+        translator.log_message("没有找到源VDF文件")
+        return 2
+    if args.plan:
+        return plan_sources(translator, sources, args.output_dir, args.languages)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    # 所有文件共用一个传输层（连接池和自适应并发）、翻译缓存和翻译线程池
+    translator.transport = translator.create_transport()
+    translator.executor = ThreadPoolExecutor(max_workers=translator.max_workers)
+    translator.translation_memory.reset_stats()
+    translator.log_message(f"共 {len(sources)} 个源文件，{len(args.languages)} 种语言，并发数: {translator.max_workers}")
+
+    all_statuses = {}
+    futures = {}
+    files = ThreadPoolExecutor(max_workers=min(FILES_IN_FLIGHT, len(sources)))
+    try:
+        futures = {source: files.submit(translate_source, translator, source,
+                                        args.output_dir or os.path.dirname(source), args.languages, args.resume)
+                   for source in sources}
+        for source, future in futures.items():
+            # 带超时等待，使 Ctrl+C 能及时生效
+            while True:
+                try:
+                    all_statuses[source] = future.result(timeout=0.5)
+                    break
+                except TimeoutError:
+                    continue
+    except KeyboardInterrupt:
+        translator.cancel_translation()
+        for future in futures.values():
+            future.cancel()
+    finally:
+        files.shutdown(wait=True)
+        translator.executor.shutdown(wait=False, cancel_futures=True)
+        translator.transport.close()
+        translator.translation_memory.trim()
+        translator.log_message(translator.translation_memory.stats_message())
+
+    statuses = [status for file_statuses in all_statuses.values() for status in file_statuses.values()]
+    failed = sum(1 for status in statuses if status == "failed")
+    # 有译文未通过检查的语言已写出文件，但缺少的条目需要再次运行
+    incomplete = sum(1 for status in statuses if status == "incomplete")
+    translator.emit("summary", files=len(sources),
+                    completed=sum(1 for status in statuses if status == "completed"),
+                    incomplete=incomplete, failed=failed, cancelled=translator.translation_cancelled)
+    if translator.translation_cancelled:
+        return 130
+    return 1 if failed or incomplete or len(all_statuses) < len(sources) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+import codecs
+import os
+import re
+import uuid
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+# 词法单元类型
+STRING = "string"
+OPEN = "open"
+CLOSE = "close"
+CONDITIONAL = "conditional"
+
+# 单次读取的字符数
+READ_SIZE = 64 * 1024
+
+# 跳过空白和 // 注释
+_SKIP_RE = re.compile(r'(?:\s+|//[^\n]*)*')
+
+# 每次匹配：可选的空白/注释 + 一个词法单元
+# （注释必须以换行结束，避免在读取边界处被截断后误识别为其它词法单元）
+_TOKEN_RE = re.compile(r'''
+    (?:\s+|//[^\n]*\n)*
+    (?:
+        "(?P<quoted>[^"\\]*(?:\\.[^"\\]*)*)"
+      | (?P<open>\{)
+      | (?P<close>\})
+      | \[(?P<conditional>[^\]\n]*)\]
+      | (?P<bare>(?!//)[^\s"{}\[\]]+)
+    )
+''', re.VERBOSE | re.DOTALL)
+
+_ESCAPE_RE = re.compile(r'\\(.)', re.DOTALL)
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '\\': '\\', '"': '"'}
+_QUOTE_RE = re.compile(r'[\\"\n\t\r]')
+_QUOTES = {'\\': '\\\\', '"': '\\"', '\n': '\\n', '\t': '\\t', '\r': '\\r'}
+
+
+class VDFSyntaxError(ValueError):
+    """VDF/KeyValues 语法错误"""
+
+    def __init__(self, message: str, line: int):
+        super().__init__(f"第 {line} 行: {message}")
+        self.line = line
+
+
+def unescape(text: str) -> str:
+    """解码带引号字符串中的转义字符"""
+    if '\\' not in text:
+        return text
+    return _ESCAPE_RE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(1)), text)
+
+
+def quote(text: str) -> str:
+    """将字符串转义并加上引号，用于写出VDF"""
+    return '"' + _QUOTE_RE.sub(lambda m: _QUOTES[m.group(0)], text) + '"'
+
+
+def open_vdf(path: str) -> TextIO:
+    """按BOM识别编码打开VDF文件（默认UTF-8）"""
+    with open(path, 'rb') as file:
+        head = file.read(4)
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        encoding = 'utf-16'
+    else:
+        encoding = 'utf-8-sig'
+    return open(path, 'r', encoding=encoding, newline='')
+
+
+def tokenize(stream: TextIO, read_size: int = READ_SIZE) -> Iterator[Tuple[str, str, int]]:
+    """单遍扫描输入流，逐个产生 (类型, 文本, 行号)，不会把整个文件读入内存"""
+    buf = stream.read(read_size)
+    eof = not buf
+    pos = 0
+    line = 1
+    want = read_size
+    while True:
+        m = _TOKEN_RE.match(buf, pos)
+        if not eof and (m is None or (m.end() == len(buf) and m.lastgroup == 'bare')):
+            # 词法单元可能被读取边界截断，读入更多内容后重新匹配；
+            # 未完成部分较长时加倍读取量，避免超长字符串退化为二次复杂度
+            want = want * 2 if len(buf) - pos > want // 2 else read_size
+            chunk = stream.read(want)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        if m is None:
+            skipped = _SKIP_RE.match(buf, pos).end()
+            if skipped >= len(buf):
+                return
+            line += buf.count('\n', pos, skipped)
+            if buf[skipped] == '"':
+                raise VDFSyntaxError("字符串缺少结束引号", line)
+            raise VDFSyntaxError(f"无法识别的字符 {buf[skipped]!r}", line)
+        kind = m.lastgroup
+        start = m.start(kind)
+        line += buf.count('\n', pos, start)
+        if kind == 'quoted':
+            text = m.group(kind)
+            yield STRING, unescape(text), line
+            line += text.count('\n')
+        elif kind == 'bare':
+            yield STRING, m.group(kind), line
+        elif kind == 'open':
+            yield OPEN, '{', line
+        elif kind == 'close':
+            yield CLOSE, '}', line
+        else:
+            yield CONDITIONAL, m.group(kind).strip(), line
+        pos = m.end()
+
+
+def iter_events(stream: TextIO) -> Iterator[tuple]:
+    """解析KeyValues，按源文件顺序产生事件：
+    ("pair", 路径, 键, 值, 条件)、("open", 路径, 键, 条件)、("close", 路径)
+    路径是包含当前元素的各级区块名称组成的元组"""
+    tokens = tokenize(stream)
+    path: List[str] = []
+    pushback = None
+    line = 1
+
+    def next_token():
+        nonlocal pushback
+        if pushback is not None:
+            token, pushback = pushback, None
+            return token
+        return next(tokens, None)
+
+    while True:
+        token = next_token()
+        if token is None:
+            if path:
+                raise VDFSyntaxError(f"区块 {path[-1]!r} 缺少结束括号", line)
+            return
+        kind, text, line = token
+        if kind == CLOSE:
+            if not path:
+                raise VDFSyntaxError("多余的结束括号", line)
+            path.pop()
+            yield "close", tuple(path)
+            continue
+        if kind != STRING:
+            raise VDFSyntaxError(f"此处应为键名，实际为 {text!r}", line)
+
+        key = text
+        token = next_token()
+        condition = None
+        if token is not None and token[0] == CONDITIONAL:
+            condition = token[1]
+            token = next_token()
+        if token is None:
+            raise VDFSyntaxError(f"键 {key!r} 缺少值", line)
+        kind, text, value_line = token
+        if kind == OPEN:
+            yield "open", tuple(path), key, condition
+            path.append(key)
+        elif kind == STRING:
+            # 条件写在值后面，例如 "key" "value" [$WIN32]
+            token = next_token()
+            if token is not None and token[0] == CONDITIONAL:
+                condition = token[1]
+            else:
+                pushback = token
+            yield "pair", tuple(path), key, text, condition
+        else:
+            raise VDFSyntaxError(f"键 {key!r} 的值无效: {text!r}", value_line)
+
+
+def parse(stream: TextIO) -> List[list]:
+    """解析为保持顺序的树：[[键, 值或子节点列表, 条件], ...]"""
+    root: List[list] = []
+    stack = [root]
+    for event in iter_events(stream):
+        if event[0] == "pair":
+            _, _, key, value, condition = event
+            stack[-1].append([key, value, condition])
+        elif event[0] == "open":
+            _, _, key, condition = event
+            children: List[list] = []
+            stack[-1].append([key, children, condition])
+            stack.append(children)
+        else:
+            stack.pop()
+    return root
+
+
+def load(path: str) -> List[list]:
+    """读取并解析VDF文件"""
+    with open_vdf(path) as stream:
+        return parse(stream)
+
+
+def _localization_pairs(stream: TextIO) -> Iterator[Tuple[Optional[str], str, Optional[str]]]:
+    """按顺序产生本地化文件中的 (键, 值, 条件)，语言字段产生 (None, 语言, 条件)"""
+    for event in iter_events(stream):
+        if event[0] != "pair":
+            continue
+        _, event_path, key, value, condition = event
+        if len(event_path) == 1 and key.lower() == "language":
+            yield None, value, condition
+        elif len(event_path) == 2 and event_path[1].lower() == "tokens":
+            yield key, value, condition
+
+
+def read_localization(path: str, log: Optional[Callable[[str], None]] = None,
+                      conditions: Optional[Dict[str, str]] = None) -> Tuple[Optional[str], Dict[str, str]]:
+    """读取Steam本地化文件，返回 (语言, Tokens区块中按顺序排列的键值)；
+    conditions 不为None时写入带条件的键的条件 {键: 条件}（如 $WIN32），供写出译文时保留。
+    重复的无条件键以最后一次出现的值为准；同名的键带有不同条件时（如 [$WIN32] 和 [$X360]）只能保留一个：
+    优先保留无条件的值，都带条件时保留第一个，舍弃的部分通过 log 给出警告"""
+    language = None
+    tokens: Dict[str, str] = {}
+    kept: Dict[str, str] = {} if conditions is None else conditions
+    # 按不同条件出现多次的键 -> 各次出现的条件（无条件为None）
+    variants: Dict[str, List[Optional[str]]] = {}
+    with open_vdf(path) as stream:
+        for key, value, condition in _localization_pairs(stream):
+            if key is None:
+                language = value
+                continue
+            if key in tokens:
+                current = kept.get(key)
+                if condition is not None or current is not None:
+                    variants.setdefault(key, [current]).append(condition)
+                    if condition is not None:
+                        continue
+                    # 无条件的值代替带条件的值
+                    del kept[key]
+            elif condition is not None:
+                kept[key] = condition
+            tokens[key] = value
+    if variants and log is not None:
+        examples = "、".join(f"{key} [{' / '.join(c or '无条件' for c in seen)}]" for key, seen in list(variants.items())[:5])
+        log(f"警告: {os.path.basename(path)} 中有 {len(variants)} 个键按不同条件出现多次，"
+            f"只保留无条件的值（都带条件时保留第一个）: {examples}" + ("等" if len(variants) > 5 else ""))
+    return language, tokens
+
+
+def iter_localization(path: str) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """逐个产生本地化文件Tokens区块中的 (键, 值, 条件)，不把整个文件读入字典"""
+    with open_vdf(path) as stream:
+        for key, value, condition in _localization_pairs(stream):
+            if key is not None:
+                yield key, value, condition
+
+
+# 本地化文件的结束部分
+LOCALIZATION_FOOTER = '\t}\n}'
+
+
+def localization_header(language: str) -> str:
+    """本地化文件的开头部分（语言和Tokens区块开始）"""
+    return f'"lang"\n{{\n\t"Language"\t{quote(language)}\n\t"Tokens"\n\t{{\n'
+
+
+def localization_entry(key: str, value: str, condition: Optional[str] = None) -> str:
+    """Tokens区块中的一行（条件写在值后面，例如 [$WIN32]）"""
+    if condition:
+        return f'\t\t{quote(key)}\t{quote(value)}\t[{condition}]\n'
+    return f'\t\t{quote(key)}\t{quote(value)}\n'
+
+
+class LocalizationWriter:
+    """流式写出Steam本地化文件：内容先写入同目录的临时文件，提交时原子替换目标文件，
+    中途出错或程序崩溃都不会留下写了一半的目标文件"""
+
+    def __init__(self, path: str, language: str, conditions: Optional[Dict[str, str]] = None):
+        self.path = path
+        # 键 -> 条件，写出时附加在值后面
+        self.conditions = conditions or {}
+        self.temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        self._file = open(self.temp_path, 'x', encoding='utf-8', newline='\n')
+        self._file.write(localization_header(language))
+        self.count = 0
+
+    def write(self, key: str, value: str):
+        """写入一个键值对"""
+        self._file.write(localization_entry(key, value, self.conditions.get(key)))
+        self.count += 1
+
+    def write_many(self, items: Iterable[Tuple[str, str]]):
+        """依次写入多个键值对"""
+        for key, value in items:
+            self.write(key, value)
+
+    def commit(self):
+        """写入结尾并原子替换目标文件"""
+        self._file.write(LOCALIZATION_FOOTER)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.temp_path, self.path)
+
+    def abort(self):
+        """放弃写入并删除临时文件"""
+        self._file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+
+def write_localization(path: str, language: str, items: Iterable[Tuple[str, str]],
+                       conditions: Optional[Dict[str, str]] = None) -> int:
+    """流式写出本地化文件，conditions 为 键 -> 条件（如 $WIN32），返回写入的键值对数量"""
+    with LocalizationWriter(path, language, conditions) as writer:
+        writer.write_many(items)
+    return writer.count
@@ -0,0 +1,1110 @@
+import configparser
+import copy
+import hashlib
+import json
+import os
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from api_transport import ChatTransport, RunawayGuard, TranslationError
+from backend_router import Backend, BackendRouter
+from glossary import Glossary, KEEP
+from output_validation import OutputValidator
+from run_journal import RunJournal
+from run_planner import CACHE_UNIT_TOKENS, RunPlan, estimate_output_tokens, estimate_tokens
+from run_telemetry import DEFAULT_PRICES, RunTelemetry
+from token_table import TokenTable
+from translation_memory import TranslationMemory
+from vdf_keyvalues import (read_localization, iter_localization, write_localization, localization_header,
+                           localization_entry, LOCALIZATION_FOOTER, VDFSyntaxError)
+
+# 默认配置文件路径
+DEFAULT_CONFIG_FILE = os.path.join(os.path.expanduser("~"), ".vdf_translator_config.ini")
+
+# Steam支持的语言代码映射
+STEAM_LANGUAGES = {
+    "arabic": "阿拉伯语",
+    "bulgarian": "保加利亚语",
+    "schinese": "简体中文",
+    "tchinese": "繁体中文",
+    "czech": "捷克语",
+    "danish": "丹麦语",
+    "dutch": "荷兰语",
+    "english": "英语",
+    "finnish": "芬兰语",
+    "french": "法语",
+    "german": "德语",
+    "greek": "希腊语",
+    "hungarian": "匈牙利语",
+    "italian": "意大利语",
+    "japanese": "日语",
+    "koreana": "韩语",
+    "norwegian": "挪威语",
+    "polish": "波兰语",
+    "portuguese": "葡萄牙语",
+    "brazilian": "巴西葡萄牙语",
+    "romanian": "罗马尼亚语",
+    "russian": "俄语",
+    "spanish": "西班牙语",
+    "latam": "拉丁美洲西班牙语",
+    "swedish": "瑞典语",
+    "thai": "泰语",
+    "turkish": "土耳其语",
+    "ukrainian": "乌克兰语",
+    "vietnamese": "越南语",
+    "indonesian": "印度尼西亚语",
+}
+
+# 提示词模板（修改模板会使翻译缓存自动失效）
+# 为了命中DeepSeek的上下文缓存（按请求前缀匹配），固定内容放在最前面：
+# 系统消息 -> 目标语言说明 -> 任务说明 -> 每次都不同的原文（始终放在最后）
+SYSTEM_PROMPT = (
+    "你是专业的游戏本地化译者，负责把Steam游戏的本地化文本从中文翻译成指定的目标语言。\n"
+    "请保持原文的语气和风格，不要添加额外的解释或说明。\n"
+    "如果原文是游戏成就名称或描述，请使用适合游戏语境的表达方式。"
+)
+
+LANGUAGE_PROMPT_TEMPLATE = "目标语言: {target_lang_name}\n"
+
+SINGLE_PROMPT_TEMPLATE = (
+    "请翻译下面的原文，只返回译文。\n"
+    "{glossary}"
+    "原文:\n"
+    "{text}"
+)
+
+BATCH_PROMPT_TEMPLATE = (
+    "请翻译下面JSON对象中每个键对应的值。\n"
+    "只返回一个JSON对象，键与原文完全一致，值替换为对应的翻译结果。\n"
+    "{glossary}"
+    "{payload}"
+)
+
+MULTI_PROMPT_TEMPLATE = (
+    "目标语言（括号前为语言代码）: {languages}\n"
+    "请把下面JSON对象中每个键对应的值分别翻译成上述每种语言。\n"
+    "只返回一个JSON对象，键与原文完全一致，每个值是以语言代码为键、对应翻译结果为值的JSON对象。\n"
+    "{glossary}"
+    "{payload}"
+)
+
+# 只包含本次请求的原文中出现的术语，放在原文之前
+GLOSSARY_PROMPT_HEADER = "术语表（必须使用以下译法，“保持原文”表示不要翻译该术语）:\n"
+GLOSSARY_KEEP_TEXT = "保持原文"
+
+PROMPT_VERSION = hashlib.sha256(
+    (SYSTEM_PROMPT + LANGUAGE_PROMPT_TEMPLATE + SINGLE_PROMPT_TEMPLATE + BATCH_PROMPT_TEMPLATE
+     + MULTI_PROMPT_TEMPLATE + GLOSSARY_PROMPT_HEADER + GLOSSARY_KEEP_TEXT).encode('utf-8')
+).hexdigest()[:16]
+
+# 流式回复超过 原文长度 × RUNAWAY_RATIO + RUNAWAY_MIN_CHARS 个字符时视为失控，提前中止
+RUNAWAY_RATIO = 8
+RUNAWAY_MIN_CHARS = 200
+
+
+class VDFTranslator:
+    """不依赖图形界面的翻译核心：读取源文件、调度翻译任务并写出各语言的本地化文件。
+    图形界面和命令行都继承此类，通过 log_message / update_status / set_progress_value 接收进度
+    （这三个方法会在工作线程中直接调用，子类需保证线程安全），dispatch 只用于必须在界面线程执行的回调"""
+
+    def __init__(self, config_file: str = DEFAULT_CONFIG_FILE):
+        # 配置文件路径
+        self.config_file = config_file
+        # 翻译缓存数据库路径（与配置文件放在同一目录）
+        self.cache_file = os.path.join(os.path.dirname(self.config_file), ".vdf_translator_cache.sqlite3")
+        
+        # 翻译使用的接口和模型
+        self.api_url = "https://api.deepseek.com/v1/chat/completions"
+        self.model = "deepseek-chat"
+        self.transport = None
+        # 多个文件共用的线程池（None 表示每次运行单独创建）
+        self.executor = None
+        
+        self.steam_languages = STEAM_LANGUAGES
+        
+        # 批量翻译时每次请求包含的文本项数量（1 表示逐条翻译）
+        self.batch_size = 20
+        # 同时进行的翻译请求数量
+        self.max_workers = 4
+        # 增量翻译：只翻译新增或原文有修改的文本，保留已有译文
+        self.incremental = True
+        # 多语言合并请求：一次请求把文本同时翻译成所有选中的语言
+        self.multi_target = False
+        
+        # 翻译状态
+        self.translation_status = {}  # 记录每种语言的翻译状态
+        self.translation_cancelled = False
+        
+        # 初始化配置
+        self.load_config()
+        
+        # 本次运行的API请求统计（每次 translate_file 重新开始）
+        self.telemetry = RunTelemetry(self.prices)
+        # 项目术语表（每次 translate_file 按源文件重新查找）
+        self.glossary = Glossary()
+        # 译文检查（占位符、残留原文、多余说明、目标文字和术语表）
+        self.validator = OutputValidator(self.glossary)
+        
+        # 本地翻译记忆库
+        self.translation_memory = TranslationMemory(self.cache_file, self.cache_max_entries)
+    
+    def load_config(self):
+        """加载配置文件"""
+        self.config = configparser.ConfigParser()
+        if os.path.exists(self.config_file):
+            self.config.read(self.config_file)
+            self.api_key = self.config.get('API', 'key', fallback='')
+        else:
+            self.api_key = ''
+        self.batch_size = self.config.getint('Translation', 'batch_size', fallback=20)
+        self.max_workers = self.config.getint('Translation', 'max_workers', fallback=4)
+        self.incremental = self.config.getboolean('Translation', 'incremental', fallback=True)
+        self.multi_target = self.config.getboolean('Translation', 'multi_target', fallback=False)
+        # 指定的术语表文件（为空时在源文件目录中查找）
+        self.glossary_file = self.config.get('Translation', 'glossary_file', fallback='')
+        # 未通过检查的译文最多重新翻译的轮数
+        self.validation_retries = self.config.getint('Translation', 'validation_retries', fallback=2)
+        self.cache_max_entries = self.config.getint('Cache', 'max_entries', fallback=200000)
+        self.request_timeout = self.config.getfloat('Network', 'timeout', fallback=60)
+        self.max_retries = self.config.getint('Network', 'max_retries', fallback=5)
+        # 流式接收回复：可以立即取消，并提前中止失控的回复
+        self.stream = self.config.getboolean('Network', 'stream', fallback=True)
+        # 对冲请求：超过历史延迟的 hedge_percentile 分位数（至少 hedge_min_delay 秒）仍未返回时再发一个请求
+        self.hedge = self.config.getboolean('Network', 'hedge', fallback=True)
+        self.hedge_percentile = self.config.getfloat('Network', 'hedge_percentile', fallback=0.95)
+        self.hedge_min_delay = self.config.getfloat('Network', 'hedge_min_delay', fallback=2.0)
+        # 额外的OpenAI兼容后端（[Backend 名称] 小节：url、model，可选 key、max_workers）
+        self.extra_backends = [
+            {
+                "name": section.split(None, 1)[1].strip(),
+                "url": self.config.get(section, 'url'),
+                "model": self.config.get(section, 'model'),
+                "key": self.config.get(section, 'key', fallback=''),
+                "max_workers": self.config.getint(section, 'max_workers', fallback=self.max_workers),
+            }
+            for section in self.config.sections()
+            if section.startswith('Backend ') and self.config.has_option(section, 'url') and self.config.has_option(section, 'model')
+        ]
+        # 费用估算使用的价格（美元 / 百万tokens）
+        self.prices = {name: self.config.getfloat('Telemetry', f'price_{name}', fallback=default)
+                       for name, default in DEFAULT_PRICES.items()}
+    
+    def save_config(self):
+        """保存配置到文件"""
+        if not self.config.has_section('API'):
+            self.config.add_section('API')
+        self.config.set('API', 'key', self.api_key)
+        if not self.config.has_section('Translation'):
+            self.config.add_section('Translation')
+        self.config.set('Translation', 'batch_size', str(self.batch_size))
+        self.config.set('Translation', 'max_workers', str(self.max_workers))
+        self.config.set('Translation', 'incremental', str(self.incremental))
+        self.config.set('Translation', 'multi_target', str(self.multi_target))
+        self.config.set('Translation', 'glossary_file', self.glossary_file)
+        self.config.set('Translation', 'validation_retries', str(self.validation_retries))
+        if not self.config.has_section('Cache'):
+            self.config.add_section('Cache')
+        self.config.set('Cache', 'max_entries', str(self.cache_max_entries))
+        if not self.config.has_section('Network'):
+            self.config.add_section('Network')
+        self.config.set('Network', 'timeout', str(self.request_timeout))
+        self.config.set('Network', 'max_retries', str(self.max_retries))
+        self.config.set('Network', 'stream', str(self.stream))
+        self.config.set('Network', 'hedge', str(self.hedge))
+        self.config.set('Network', 'hedge_percentile', str(self.hedge_percentile))
+        self.config.set('Network', 'hedge_min_delay', str(self.hedge_min_delay))
+        if not self.config.has_section('Telemetry'):
+            self.config.add_section('Telemetry')
+        for name, price in self.prices.items():
+            self.config.set('Telemetry', f'price_{name}', str(price))
+        
+        with open(self.config_file, 'w', encoding='utf-8') as configfile:
+            self.config.write(configfile)
+    
+    def fork(self) -> "VDFTranslator":
+        """创建共用配置、传输层、翻译缓存和线程池的新实例，用于同时处理多个源文件"""
+        worker = copy.copy(self)
+        worker.translation_status = {}
+        return worker
+    
+    def dispatch(self, callback: Callable[[], None]):
+        """在界面线程中执行回调（无界面时直接执行）"""
+        callback()
+    
+    def log_message(self, message):
+        """输出日志消息"""
+        print(message)
+    
+    def update_status(self, message):
+        """更新状态（无界面时忽略）"""
+    
+    def set_progress_value(self, value):
+        """更新进度百分比（无界面时忽略）"""
+    
+    def extract_tokens_from_vdf(self, vdf_file_path: str) -> tuple:
+        """从VDF文件中提取语言和tokens（单遍流式解析KeyValues格式）"""
+        return read_localization(vdf_file_path, log=self.log_message)
+
+    def load_source_tokens(self, source_file: str) -> Tuple[Optional[str], TokenTable]:
+        """读取源文件，返回 (语言, TokenTable)：键和原文只保存一份，各语言的译文按列存放，
+        键值的条件（如 [$WIN32]）在写出译文时保留"""
+        conditions = {}
+        source_lang, tokens = read_localization(source_file, log=self.log_message, conditions=conditions)
+        return source_lang, TokenTable(tokens.items(), self.source_fingerprint, conditions)
+
+    def create_transport(self) -> BackendRouter:
+        """创建传输层：默认后端（DeepSeek）和配置中的其他后端各有连接池、重试和自适应并发，
+        由路由器选择后端并对慢请求发送对冲请求"""
+        endpoints = [{"name": "deepseek", "url": self.api_url, "model": self.model,
+                      "key": self.api_key, "max_workers": self.max_workers}] + self.extra_backends
+        backends = [
+            Backend(endpoint["name"], ChatTransport(
+                endpoint["url"],
+                endpoint["key"],
+                max_workers=endpoint["max_workers"],
+                timeout=self.request_timeout,
+                max_retries=self.max_retries,
+                cancelled=lambda: self.translation_cancelled,
+                log=self.log_message
+            ), endpoint["model"])
+            for endpoint in endpoints
+        ]
+        return BackendRouter(
+            backends,
+            hedge=self.hedge,
+            hedge_percentile=self.hedge_percentile,
+            hedge_min_delay=self.hedge_min_delay,
+            cancelled=lambda: self.translation_cancelled,
+            log=self.log_message
+        )
+
+    def request_completion(self, prompt: str, max_tokens: int = 1000, json_mode: bool = False, languages: Iterable[str] = (),
+                           source_length: int = 0) -> Tuple[str, str]:
+        """发送一次DeepSeek对话请求，返回 (回复文本, 给出回复的模型)（失败时抛出 TranslationError），
+        延迟、重试、token用量和流量按 languages 记入本次运行的统计；
+        流式接收时回复远长于 source_length 或不断重复会提前中止并重试"""
+        if self.transport is None:
+            self.transport = self.create_transport()
+        
+        payload = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.3,
+            "max_tokens": max_tokens
+        }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        guard = None
+        if self.stream:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+            guard = lambda: RunawayGuard(source_length * RUNAWAY_RATIO + RUNAWAY_MIN_CHARS)
+        
+        call = {}
+        start = time.monotonic()
+        try:
+            result = self.transport.post_chat(payload, call, guard, size=source_length)
+        except TranslationError:
+            # 用户取消而中止的请求不计入失败
+            if not self.translation_cancelled:
+                self.telemetry.record(languages, time.monotonic() - start, call, None, ok=False)
+            raise
+        self.telemetry.record(languages, time.monotonic() - start, call, result.get('usage'))
+        try:
+            content = result['choices'][0]['message']['content'].strip()
+        except (KeyError, IndexError, TypeError, AttributeError):
+            raise TranslationError("响应中没有翻译内容")
+        # 多个后端时回复可能来自其他模型
+        return content, call.get('model') or self.model
+
+    def cache_namespace(self, model: Optional[str] = None) -> str:
+        """翻译缓存的命名空间（模型名称 + 提示词版本），model 默认为主模型"""
+        return f"{model or self.model}:{PROMPT_VERSION}"
+
+    def lookup_namespaces(self) -> List[str]:
+        """查询翻译缓存时使用的命名空间：默认模型优先，其次是其他后端的模型"""
+        namespaces = [self.cache_namespace()]
+        for backend in self.extra_backends:
+            namespace = self.cache_namespace(backend["model"])
+            if namespace not in namespaces:
+                namespaces.append(namespace)
+        return namespaces
+
+    def language_prompt(self, target_language: str) -> str:
+        """某种语言所有请求共用的提示词前缀"""
+        # 获取目标语言的本地名称
+        target_lang_name = self.steam_languages.get(target_language, target_language)
+        return LANGUAGE_PROMPT_TEMPLATE.format(target_lang_name=target_lang_name)
+
+    def glossary_prompt(self, texts: Iterable[str], languages: List[str]) -> str:
+        """本次请求的原文中出现的术语及其译法（没有匹配的术语时为空）"""
+        texts = list(texts)
+        lines = {}
+        for lang in languages:
+            for term, rule in self.glossary.match(texts, lang).items():
+                translation = GLOSSARY_KEEP_TEXT if rule is KEEP else rule
+                lines.setdefault(term, []).append(translation if len(languages) == 1 else f"{lang}={translation}")
+        if not lines:
+            return ""
+        return GLOSSARY_PROMPT_HEADER + "".join(f"{term} → {'; '.join(rules)}\n" for term, rules in lines.items())
+
+    def validation_failures(self, items: Dict[str, str], translated: Dict[str, str], target_language: str) -> Dict[str, List[str]]:
+        """返回未通过检查的键：{键: 问题列表}"""
+        failures = {}
+        for key, value in items.items():
+            if key in translated:
+                problems = self.validator.check(value, translated[key], target_language)
+                if problems:
+                    failures[key] = problems
+        return failures
+
+    def enforce_validation(self, items: Dict[str, str], translated: Dict[str, str], target_language: str) -> List[str]:
+        """只把未通过检查的键重新翻译（最多 validation_retries 轮），结果直接更新到 translated；
+        仍未通过的译文从 translated 中删除（不写入文件，下次运行重新翻译），返回这些键"""
+        lang_name = self.steam_languages.get(target_language, target_language)
+        for _ in range(self.validation_retries):
+            failures = self.validation_failures(items, translated, target_language)
+            if not failures or self.translation_cancelled:
+                return []
+            self.log_message(f"{lang_name}: {len(failures)} 项译文未通过检查，重新翻译")
+            translated.update(self.request_batch({key: items[key] for key in failures}, target_language))
+        failures = self.validation_failures(items, translated, target_language)
+        for key, problems in failures.items():
+            self.log_message(f"警告: {key} 的{lang_name}译文仍未通过检查，不采用: {'；'.join(problems)}")
+            del translated[key]
+        return list(failures)
+
+    def single_prompt(self, text: str, target_language: str) -> str:
+        """翻译单个文本的提示词"""
+        return self.language_prompt(target_language) + SINGLE_PROMPT_TEMPLATE.format(
+            glossary=self.glossary_prompt([text], [target_language]),
+            text=text
+        )
+
+    def batch_prompt(self, items: Dict[str, str], target_language: str) -> Tuple[str, str]:
+        """批量翻译一组键值对的提示词，返回 (提示词, 原文JSON)"""
+        payload = json.dumps(items, ensure_ascii=False, indent=0)
+        return self.language_prompt(target_language) + BATCH_PROMPT_TEMPLATE.format(
+            glossary=self.glossary_prompt(items.values(), [target_language]),
+            payload=payload
+        ), payload
+
+    def multi_prompt(self, items: Dict[str, str], languages: List[str]) -> Tuple[str, str]:
+        """一次翻译成多种语言的提示词，返回 (提示词, 原文JSON)"""
+        language_list = "、".join(f"{lang}（{self.steam_languages.get(lang, lang)}）" for lang in languages)
+        payload = json.dumps(items, ensure_ascii=False, indent=0)
+        return MULTI_PROMPT_TEMPLATE.format(
+            languages=language_list,
+            glossary=self.glossary_prompt(items.values(), languages),
+            payload=payload
+        ), payload
+
+    def request_translation(self, text: str, target_language: str) -> Tuple[str, str]:
+        """请求API翻译单个文本，返回 (译文, 给出译文的模型)（出错时抛出异常）"""
+        prompt = self.single_prompt(text, target_language)
+        translated_text, model = self.request_completion(prompt, languages=[target_language], source_length=len(text))
+        # 清理可能的额外文本
+        if "翻译结果:" in translated_text:
+            translated_text = translated_text.split("翻译结果:")[-1].strip()
+        return translated_text, model
+
+    def translate_text(self, text: str, target_language: str) -> str:
+        """使用DeepSeek API翻译单个文本（优先使用翻译缓存，失败时抛出 TranslationError）"""
+        if not text.strip() or self.translation_cancelled:
+            return text
+        
+        cached = self.translation_memory.get(text, target_language, self.lookup_namespaces())
+        if cached is not None:
+            return cached
+        
+        translated_text, model = self.request_translation(text, target_language)
+        self.translation_memory.put(text, translated_text, target_language, self.cache_namespace(model))
+        return translated_text
+
+    def parse_json_reply(self, reply: str) -> Optional[dict]:
+        """从模型回复中解析JSON对象，解析失败返回None"""
+        start = reply.find('{')
+        end = reply.rfind('}')
+        if start == -1 or end < start:
+            return None
+        try:
+            data = json.loads(reply[start:end + 1])
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def translate_batch(self, items: Dict[str, str], target_language: str) -> Dict[str, str]:
+        """在一次请求中翻译一组键值对（已缓存的文本不再请求API）"""
+        if not items or self.translation_cancelled:
+            return dict(items)
+        
+        cached = self.translation_memory.get_many(items.values(), target_language, self.lookup_namespaces())
+        translated = {key: cached[value] for key, value in items.items() if value in cached}
+        # 未通过检查（例如不符合当前术语表）的缓存译文重新翻译
+        for key in self.validation_failures(items, translated, target_language):
+            del translated[key]
+        misses = {key: value for key, value in items.items() if key not in translated}
+        rejected = []
+        if misses:
+            translated.update(self.request_batch(misses, target_language))
+            rejected = self.enforce_validation(misses, translated, target_language)
+        
+        # 未通过检查的键不在结果中
+        return {key: translated.get(key, value) for key, value in items.items() if key not in rejected}
+
+    def request_batch(self, items: Dict[str, str], target_language: str) -> Dict[str, str]:
+        """请求API翻译一组键值对，回复缺失或错位的部分会拆分后重新翻译（失败时抛出 TranslationError）"""
+        if not items or self.translation_cancelled:
+            return dict(items)
+        
+        if len(items) == 1:
+            key, value = next(iter(items.items()))
+            translated_text, model = self.request_translation(value, target_language)
+            self.translation_memory.put(value, translated_text, target_language, self.cache_namespace(model))
+            return {key: translated_text}
+        
+        prompt, payload = self.batch_prompt(items, target_language)
+        reply, model = self.request_completion(prompt, max_tokens=8192, json_mode=True, languages=[target_language],
+                                               source_length=len(payload))
+        data = self.parse_json_reply(reply)
+        translated = {}
+        if data is not None:
+            # 只采用请求中的键，回复中多出的键忽略
+            for key, value in data.items():
+                if key in items and isinstance(value, str) and value.strip():
+                    translated[key] = value.strip()
+        self.translation_memory.put_many(
+            {items[key]: value for key, value in translated.items()}, target_language, self.cache_namespace(model)
+        )
+        
+        # 回复中缺失或错位的键单独重新翻译
+        missing = {key: value for key, value in items.items() if key not in translated}
+        if missing:
+            self.log_message(f"批量回复缺少 {len(missing)}/{len(items)} 项，拆分后重新翻译")
+            if len(missing) == len(items):
+                keys = list(items)
+                half = len(keys) // 2
+                translated.update(self.request_batch({k: items[k] for k in keys[:half]}, target_language))
+                translated.update(self.request_batch({k: items[k] for k in keys[half:]}, target_language))
+            else:
+                translated.update(self.request_batch(missing, target_language))
+        
+        return {key: translated.get(key, value) for key, value in items.items()}
+
+    def translate_multi(self, items: Dict[str, str], languages: List[str]) -> Dict[str, Dict[str, str]]:
+        """一次请求把一组键值对同时翻译成多种语言，返回 {语言: {键: 译文}}；
+        回复中缺少的语言或键会按单一语言单独重新翻译（失败时抛出 TranslationError）"""
+        if not items or self.translation_cancelled:
+            return {lang: dict(items) for lang in languages}
+        
+        namespaces = self.lookup_namespaces()
+        translated = {}
+        for lang in languages:
+            cached = self.translation_memory.get_many(items.values(), lang, namespaces)
+            translated[lang] = {key: cached[value] for key, value in items.items() if value in cached}
+            for key in self.validation_failures(items, translated[lang], lang):
+                del translated[lang][key]
+        
+        pending_languages = [lang for lang in languages if len(translated[lang]) < len(items)]
+        if len(pending_languages) > 1:
+            misses = {key: value for key, value in items.items()
+                      if any(key not in translated[lang] for lang in pending_languages)}
+            prompt, payload = self.multi_prompt(misses, pending_languages)
+            reply, model = self.request_completion(prompt, max_tokens=8192, json_mode=True, languages=pending_languages,
+                                                   source_length=len(payload) * len(pending_languages))
+            data = self.parse_json_reply(reply) or {}
+            for lang in pending_languages:
+                new_translations = {}
+                for key, value in misses.items():
+                    entry = data.get(key)
+                    result = entry.get(lang) if isinstance(entry, dict) else None
+                    if key not in translated[lang] and isinstance(result, str) and result.strip():
+                        new_translations[key] = result.strip()
+                translated[lang].update(new_translations)
+                self.translation_memory.put_many(
+                    {items[key]: value for key, value in new_translations.items()}, lang, self.cache_namespace(model)
+                )
+        
+        # 回复中缺少的语言单独重新翻译
+        rejected = {lang: [] for lang in languages}
+        for lang in pending_languages:
+            missing = {key: value for key, value in items.items() if key not in translated[lang]}
+            if missing:
+                if len(pending_languages) > 1:
+                    self.log_message(f"多语言回复缺少 {self.steam_languages.get(lang, lang)} 的 {len(missing)} 项，单独重新翻译")
+                translated[lang].update(self.request_batch(missing, lang))
+            rejected[lang] = self.enforce_validation(items, translated[lang], lang)
+        
+        # 未通过检查的键不在结果中
+        return {lang: {key: translated[lang].get(key, value) for key, value in items.items() if key not in rejected[lang]}
+                for lang in languages}
+
+    def run_job(self, languages: List[str], items: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+        """执行一个翻译任务，返回 {语言: {键: 译文}}（译文未通过检查的键不在结果中）"""
+        if len(languages) == 1:
+            return {languages[0]: self.translate_batch(items, languages[0])}
+        return self.translate_multi(items, languages)
+
+    def plan_jobs(self, tokens: Dict[str, str], selected_languages: List[str], lang_groups: Dict[str, Dict[str, List[str]]]) -> List[tuple]:
+        """生成翻译任务列表 [(语言列表, {任务键: 原文}, {语言: {任务键: 该语言的键}} 或 None)]；
+        待翻译文本相同的语言共用同一批原文字典，任务中不能修改"""
+        if not self.multi_target or len(selected_languages) < 2:
+            # 每个任务是单一语言的一批文本，按语言顺序入队，使靠前的语言尽早完成并写出
+            shared = {}
+            jobs = []
+            for lang in selected_languages:
+                groups = lang_groups[lang]
+                if id(groups) not in shared:
+                    shared[id(groups)] = [{key: tokens[key] for key in batch_keys}
+                                          for batch_keys in self.plan_batches({key: tokens[key] for key in groups})]
+                jobs.extend(([lang], items, None) for items in shared[id(groups)])
+            return jobs
+        
+        # 多语言合并：需要翻译的语言集合相同的文本放在同一个请求中
+        text_keys = {}
+        for lang in selected_languages:
+            for key in lang_groups[lang]:
+                normalized = unicodedata.normalize('NFC', tokens[key]).strip()
+                text_keys.setdefault(normalized, {})[lang] = key
+        
+        by_languages = {}
+        for keys_by_lang in text_keys.values():
+            languages = tuple(lang for lang in selected_languages if lang in keys_by_lang)
+            by_languages.setdefault(languages, []).append(keys_by_lang)
+        
+        jobs = []
+        for languages, entries in by_languages.items():
+            # 回复长度随语言数量增长，每个请求包含的文本数相应减少
+            size = max(1, self.batch_size // len(languages))
+            for i in range(0, len(entries), size):
+                items = {}
+                key_map = {lang: {} for lang in languages}
+                for keys_by_lang in entries[i:i + size]:
+                    job_key = keys_by_lang[languages[0]]
+                    items[job_key] = tokens[job_key]
+                    for lang in languages:
+                        key_map[lang][job_key] = keys_by_lang[lang]
+                jobs.append((list(languages), items, key_map))
+        return jobs
+
+    def plan_batches(self, tokens: Dict[str, str], batch_size: Optional[int] = None) -> List[List[str]]:
+        """将需要翻译的非空tokens按批量大小分组"""
+        if batch_size is None:
+            batch_size = self.batch_size
+        batch_size = max(1, batch_size)
+        pending = [key for key, value in tokens.items() if value.strip()]
+        return [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    def group_duplicate_keys(self, tokens: Dict[str, str], keys: Iterable[str]) -> Dict[str, List[str]]:
+        """按规范化后的原文分组，返回 {代表键: [原文相同的所有键]}，每组只需翻译一次"""
+        representatives = {}
+        groups = {}
+        for key in keys:
+            normalized = unicodedata.normalize('NFC', tokens[key]).strip()
+            representative = representatives.setdefault(normalized, key)
+            groups.setdefault(representative, []).append(key)
+        return groups
+
+    def expand_duplicates(self, groups: Dict[str, List[str]], translated: Dict[str, str]) -> Dict[str, str]:
+        """把代表键的翻译结果分发给原文相同的所有键"""
+        return {key: value for representative, value in translated.items() for key in groups.get(representative, [representative])}
+
+    def translate_tokens(self, tokens: Dict[str, str], target_language: str, batch_size: Optional[int] = None) -> Dict[str, str]:
+        """翻译所有tokens（默认按批量模式发送，相同原文只翻译一次）"""
+        translated_tokens = dict(tokens)  # 空值保持不变
+        groups = self.group_duplicate_keys(tokens, tokens)
+        batches = self.plan_batches({key: tokens[key] for key in groups}, batch_size)
+        total_tokens = sum(len(batch_keys) for batch_keys in batches)
+        current = 0
+        
+        saved = len(self.plan_batches(tokens, batch_size)) - len(batches)
+        if saved > 0:
+            self.log_message(f"相同原文去重后节省 {saved} 次API请求")
+        self.log_message(f"开始翻译 {total_tokens} 个文本项到 {self.steam_languages.get(target_language, target_language)}...")
+        
+        for batch_keys in batches:
+            if self.translation_cancelled:
+                break
+            
+            current += len(batch_keys)
+            self.log_message(f"翻译进度: {current}/{total_tokens} - {batch_keys[-1]}")
+            batch = {key: tokens[key] for key in batch_keys}
+            translated_tokens.update(self.expand_duplicates(groups, self.translate_batch(batch, target_language)))
+        
+        return translated_tokens
+
+    def create_vdf_content(self, language: str, tokens: Dict[str, str]) -> str:
+        """创建VDF文件内容"""
+        parts = [localization_header(language)]
+        parts.extend(localization_entry(key, value) for key, value in tokens.items())
+        parts.append(LOCALIZATION_FOOTER)
+        return ''.join(parts)
+
+    def get_base_id(self, source_file: str) -> str:
+        """从源文件名中提取基础ID (假设格式为 "数字_loc_语言")"""
+        base_name = os.path.splitext(os.path.basename(source_file))[0]
+        return base_name.split('_loc_')[0]
+
+    def get_output_path(self, source_file: str, output_dir: str, target_lang: str) -> str:
+        """生成某种语言的输出文件路径"""
+        return os.path.join(output_dir, f"{self.get_base_id(source_file)}_loc_{target_lang}.vdf")
+
+    def write_language_file(self, source_file: str, output_dir: str, target_lang: str, items: Iterable[Tuple[str, str]],
+                            conditions: Optional[Dict[str, str]] = None) -> str:
+        """流式保存单个语言的VDF文件（先写临时文件再原子替换），conditions 为 键 -> 条件，返回输出路径"""
+        output_path = self.get_output_path(source_file, output_dir, target_lang)
+        write_localization(output_path, target_lang, items, conditions)
+        return output_path
+
+    def source_fingerprint(self, text: str) -> str:
+        """计算原文指纹，用于判断原文是否被修改"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+    def find_glossary_file(self, source_file: str) -> Optional[str]:
+        """查找术语表：优先使用配置中指定的文件，否则依次查找源文件目录中的
+        {基础ID}_glossary.json 和 glossary.json"""
+        if self.glossary_file:
+            return self.glossary_file
+        source_dir = os.path.dirname(os.path.abspath(source_file))
+        for name in (f"{self.get_base_id(source_file)}_glossary.json", "glossary.json"):
+            path = os.path.join(source_dir, name)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def get_manifest_path(self, source_file: str, output_dir: str) -> str:
+        """原文指纹清单的路径（记录每种语言输出文件对应的原文版本）"""
+        return os.path.join(output_dir, f"{self.get_base_id(source_file)}_loc_sources.json")
+
+    def get_telemetry_paths(self, source_file: str, output_dir: str) -> Tuple[str, str]:
+        """请求统计报告的路径（JSON报告和Prometheus文本文件）"""
+        base = os.path.join(output_dir, f"{self.get_base_id(source_file)}_loc_telemetry")
+        return base + ".json", base + ".prom"
+
+    def get_journal_path(self, source_file: str, output_dir: str) -> str:
+        """运行日志的路径（记录本次运行已完成的翻译结果，用于崩溃后继续）"""
+        return os.path.join(output_dir, f"{self.get_base_id(source_file)}_loc_journal.jsonl")
+
+    def load_source_manifest(self, manifest_path: str, tokens: TokenTable):
+        """读取原文指纹清单 {语言: {键: 原文指纹}} 到 tokens 中（文件不存在或损坏时为空）"""
+        if not os.path.exists(manifest_path):
+            return
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as file:
+                tokens.read_manifest(file)
+        except (OSError, ValueError):
+            pass
+
+    def save_source_manifest(self, manifest_path: str, tokens: TokenTable):
+        """保存原文指纹清单"""
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8', newline='\n') as file:
+            tokens.write_manifest(file)
+        os.replace(temp_path, manifest_path)
+
+    def plan_incremental(self, tokens: TokenTable, language: str, output_path: Optional[str]) -> tuple:
+        """对比已有输出文件，把已有译文写入 tokens 中该语言的列，返回 (需要翻译的键, 删除的键数量)"""
+        tokens.add_language(language)
+        deleted = set()
+        # 条件与源文件不同的键（源文件中修改了条件）
+        stale = set()
+        if output_path and os.path.exists(output_path):
+            # 逐项读取已有输出，只保留源文件中仍存在的键的译文
+            for key, value, condition in iter_localization(output_path):
+                if key in tokens:
+                    tokens.set_translation(language, key, value, done=False)
+                    if condition != tokens.conditions.get(key):
+                        stale.add(key)
+                else:
+                    deleted.add(key)
+        
+        todo = []
+        for key, value in tokens.items():
+            existing = tokens.translation(language, key)
+            if existing is not None and key not in stale:
+                recorded = tokens.manifest_fingerprint(language, key)
+                if recorded is None or recorded == tokens.fingerprint(key):
+                    # 原文未修改（或旧版本输出没有指纹记录），保留已有译文（包括手动修改过的译文）
+                    tokens.set_translation(language, key, existing)
+                    continue
+            if value.strip():
+                todo.append(key)
+            else:
+                tokens.set_translation(language, key, value)  # 保持空值不变
+        return todo, len(deleted)
+
+    def run_translation_jobs(self, tokens: TokenTable, selected_languages: List[str], source_file: str, output_dir: str, resume: bool = False):
+        """把所有 (文本批次, 目标语言) 任务放入同一个队列，由线程池并发执行"""
+        # 运行日志：继续上次运行时读取已完成的结果，否则重新开始记录
+        journal = RunJournal(self.get_journal_path(source_file, output_dir))
+        header = {
+            "source": os.path.abspath(source_file),
+            "languages": selected_languages,
+            "model": self.model,
+            "prompt": PROMPT_VERSION,
+        }
+        journal_entries = {}
+        if resume:
+            old_header, journal_entries = journal.load()
+            # 源文件、模型或提示词版本不同时，日志中的结果不再适用
+            mismatched = [name for name in ("source", "model", "prompt")
+                          if (old_header or {}).get(name) != header[name]]
+            if mismatched:
+                self.log_message(f"运行日志与当前设置不一致（{', '.join(mismatched)}），不使用其中的结果，重新开始")
+                journal_entries = {}
+                resume = False
+            else:
+                journal.resume()
+        if not resume:
+            journal.start(header)
+        
+        try:
+            self._run_translation_jobs(tokens, selected_languages, source_file, output_dir, journal, journal_entries)
+        finally:
+            # 全部语言完成后删除日志，否则只保留未完成语言的结果
+            unfinished = [lang for lang in selected_languages
+                          if self.translation_status.get(lang) not in ("completed", "incomplete")]
+            if unfinished:
+                journal.compact(unfinished)
+            else:
+                journal.remove()
+
+    def _run_translation_jobs(self, tokens, selected_languages, source_file, output_dir, journal, journal_entries):
+        """run_translation_jobs 的调度主体"""
+        manifest_path = self.get_manifest_path(source_file, output_dir)
+        self.load_source_manifest(manifest_path, tokens)
+        
+        lang_groups = {}
+        # 需要翻译的键相同的语言共用同一个分组（首次翻译时所有语言都相同）
+        shared_groups = []
+        changed = {}
+        saved_requests = 0
+        for lang in selected_languages:
+            if self.incremental:
+                output_path = self.get_output_path(source_file, output_dir, lang)
+                try:
+                    todo, deleted = self.plan_incremental(tokens, lang, output_path)
+                except (VDFSyntaxError, OSError, UnicodeError) as e:
+                    # 已有输出可能包含手动修改，无法解析时不覆盖，只有该语言失败，其他语言照常翻译
+                    tokens.drop_language(lang)
+                    self.translation_status[lang] = "failed"
+                    self.log_message(f"无法读取已有的{self.steam_languages[lang]}文件 {output_path}: {e}，"
+                                     f"跳过该语言（修复或删除该文件后重新运行）")
+                    lang_groups[lang] = {}
+                    changed[lang] = False
+                    continue
+                changed[lang] = bool(todo) or deleted > 0 or not os.path.exists(output_path)
+                if os.path.exists(output_path):
+                    self.log_message(f"{self.steam_languages[lang]}: 新增或修改 {len(todo)} 项, "
+                                     f"删除 {deleted} 项, 保留 {len(tokens) - len(todo)} 项")
+            else:
+                todo, _ = self.plan_incremental(tokens, lang, None)
+                changed[lang] = True
+            
+            # 运行日志中原文未修改的结果直接采用
+            recovered = journal_entries.pop(lang, {})
+            if recovered:
+                pending = []
+                for key in todo:
+                    entry = recovered.get(key)
+                    if entry is not None and entry[0] == tokens.fingerprint(key):
+                        tokens.set_translation(lang, key, entry[1])
+                    else:
+                        pending.append(key)
+                if len(pending) < len(todo):
+                    changed[lang] = True
+                    self.log_message(f"{self.steam_languages[lang]}: 从运行日志恢复 {len(todo) - len(pending)} 项")
+                todo = pending
+            # 相同原文只翻译一次，结果再分发给所有共享该原文的键
+            for shared_todo, groups in shared_groups:
+                if shared_todo == todo:
+                    lang_groups[lang] = groups
+                    break
+            else:
+                lang_groups[lang] = self.group_duplicate_keys(tokens, todo)
+                shared_groups.append((todo, lang_groups[lang]))
+            saved_requests += (len(self.plan_batches({key: tokens[key] for key in todo}))
+                               - len(self.plan_batches({key: tokens[key] for key in lang_groups[lang]})))
+        
+        jobs = self.plan_jobs(tokens, selected_languages, lang_groups)
+        job_counts = {lang: 0 for lang in selected_languages}
+        for languages, _, _ in jobs:
+            for lang in languages:
+                job_counts[lang] += 1
+        remaining = dict(job_counts)
+        # 各语言译文未通过检查而没有采用的键数
+        rejected = {lang: 0 for lang in selected_languages}
+        total_jobs = len(jobs)
+        # 进度按 (键, 语言) 计算，每批结果返回后立即更新
+        total_items = sum(len(keys) for lang in selected_languages for keys in lang_groups[lang].values())
+        finished_items = 0
+        
+        if saved_requests > 0:
+            self.log_message(f"相同原文去重后节省 {saved_requests} 次API请求")
+        if self.multi_target and len(selected_languages) > 1:
+            single_jobs = sum(len(self.plan_batches({key: tokens[key] for key in lang_groups[lang]})) for lang in selected_languages)
+            if single_jobs > total_jobs:
+                self.log_message(f"多语言合并请求: {total_jobs} 个请求代替 {single_jobs} 个单语言请求")
+        
+        self.log_message(f"共 {total_jobs} 个翻译任务（{len(selected_languages)} 种语言），并发数: {self.max_workers}")
+        
+        def save_language(lang) -> str:
+            """按源文件顺序写出某种语言的文件并更新原文指纹清单：
+            已完成的键写入新译文，尚未完成但有旧译文的键保留旧译文和旧指纹"""
+            output_path = self.write_language_file(source_file, output_dir, lang, tokens.translated_items(lang), tokens.conditions)
+            tokens.commit_fingerprints(lang)
+            self.save_source_manifest(manifest_path, tokens)
+            return output_path
+        
+        def finish_language(lang):
+            """某种语言的全部任务完成后立即写出文件"""
+            try:
+                if changed[lang]:
+                    output_path = save_language(lang)
+                    self.log_message(f"翻译完成! 文件已保存到: {output_path}")
+                else:
+                    if self.incremental and not tokens.has_manifest(lang):
+                        # 旧版本的输出没有原文指纹记录：记录当前原文指纹，之后修改的原文才能被发现
+                        tokens.commit_fingerprints(lang)
+                        self.save_source_manifest(manifest_path, tokens)
+                    self.log_message(f"{self.steam_languages[lang]} 没有变化，保留原文件")
+                if rejected[lang]:
+                    # 这些键保留旧译文（或不写入）且不记录新的原文指纹，下次运行会重新翻译
+                    self.translation_status[lang] = "incomplete"
+                    self.log_message(f"{self.steam_languages[lang]}: {rejected[lang]} 项译文未通过检查，未写入新译文，下次运行将重新翻译")
+                else:
+                    self.translation_status[lang] = "completed"
+            except Exception as e:
+                self.translation_status[lang] = "failed"
+                self.log_message(f"翻译到 {self.steam_languages[lang]} 时出错: {e}")
+            finally:
+                tokens.drop_language(lang)
+        
+        # 没有可翻译内容的语言直接写出
+        for lang in selected_languages:
+            if remaining[lang] == 0 and self.translation_status[lang] == "pending":
+                finish_language(lang)
+        
+        # 共享线程池时（命令行同时处理多个文件）不关闭线程池，只取消本文件未开始的任务
+        executor = self.executor or ThreadPoolExecutor(max_workers=max(1, self.max_workers))
+        # 只保持并发数两倍的任务在队列中，结果处理完再提交后续任务，
+        # 接口很快时已完成但尚未处理的结果也不会堆积，各语言按顺序完成并释放译文列
+        pending_jobs = iter(jobs)
+        window = 2 * max(1, self.max_workers)
+        futures = {}
+        
+        def submit_jobs():
+            while len(futures) < window:
+                job = next(pending_jobs, None)
+                if job is None:
+                    return
+                # 已经失败的语言不再请求（结果不会被采用），多语言任务中去掉这些语言
+                languages, items, key_map = job
+                live = [lang for lang in languages if self.translation_status[lang] == "pending"]
+                if not live:
+                    continue
+                futures[executor.submit(self.run_job, live, items)] = (live, items, key_map)
+        
+        try:
+            submit_jobs()
+            while futures:
+                if self.translation_cancelled:
+                    break
+                done, _ = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # 取消后完成的任务可能返回未翻译的原文，不再采用
+                    if self.translation_cancelled:
+                        break
+                    # 已完成的任务不再保留原文和结果
+                    languages, items, key_map = futures.pop(future)
+                    try:
+                        job_result = future.result()
+                    except Exception as e:
+                        # 不使用原文代替译文，相关语言标记为失败
+                        for lang in languages:
+                            if self.translation_status[lang] == "pending":
+                                self.translation_status[lang] = "failed"
+                                self.log_message(f"翻译到 {self.steam_languages[lang]} 时出错: {e}")
+                        continue
+                    
+                    for lang in languages:
+                        if self.translation_status[lang] != "pending":
+                            continue
+                        translated = job_result[lang]
+                        missing = [key for key in items if key not in translated]
+                        if key_map is not None:
+                            translated = {key_map[lang][key]: value for key, value in translated.items()}
+                            missing = [key_map[lang][key] for key in missing]
+                        batch_result = self.expand_duplicates(lang_groups[lang], translated)
+                        tokens.record(lang, batch_result)
+                        journal.record(lang, ((key, tokens.fingerprint(key), value) for key, value in batch_result.items()))
+                        missing_count = sum(len(lang_groups[lang].get(key, [key])) for key in missing)
+                        rejected[lang] += missing_count
+                        finished_items += len(batch_result) + missing_count
+                        remaining[lang] -= 1
+                        if remaining[lang] == 0:
+                            finish_language(lang)
+                
+                progress = (finished_items / total_items) * 100 if total_items else 100
+                done_languages = sum(1 for status in self.translation_status.values() if status != "pending")
+                self.set_progress_value(progress)
+                self.update_status(f"正在翻译 {finished_items}/{total_items} 项 ({done_languages}/{len(selected_languages)} 种语言已完成)")
+                submit_jobs()
+        finally:
+            if executor is self.executor:
+                for future in futures:
+                    future.cancel()
+            else:
+                executor.shutdown(wait=False, cancel_futures=True)
+        
+        for lang in selected_languages:
+            status = self.translation_status[lang]
+            if status == "pending" and self.translation_cancelled:
+                self.translation_status[lang] = "cancelled"
+            elif status != "failed" or not tokens.has_language(lang):
+                continue
+            # 增量模式下保存已完成的部分，下次运行只翻译剩余的文本
+            if self.incremental and remaining[lang] < job_counts[lang]:
+                try:
+                    output_path = save_language(lang)
+                    self.log_message(f"{self.steam_languages[lang]} 已保存部分翻译结果: {output_path}")
+                except Exception as e:
+                    self.log_message(f"保存 {self.steam_languages[lang]} 的部分结果时出错: {e}")
+        if self.translation_cancelled:
+            self.log_message("翻译已取消")
+
+    def get_resume_languages(self, source_file: str, output_dir: str) -> Optional[List[str]]:
+        """读取运行日志中记录的目标语言，没有可以继续的运行时返回None"""
+        header, _ = RunJournal(self.get_journal_path(source_file, output_dir)).load()
+        if header is None:
+            return None
+        return [lang for lang in header.get("languages", []) if lang in self.steam_languages]
+
+    def translate_file(self, source_file: str, output_dir: str, selected_languages: List[str], resume: bool = False) -> Dict[str, str]:
+        """把一个源文件翻译成所选语言，返回每种语言的翻译状态"""
+        self.translation_status = {lang: "pending" for lang in selected_languages}
+        self.telemetry = RunTelemetry(self.prices)
+        
+        self.load_glossary(source_file)
+        
+        # 提取源文件信息（键和原文只保存一份，各语言的译文按列存放）
+        source_lang, tokens = self.load_source_tokens(source_file)
+        self.log_message(f"源文件语言: {source_lang}")
+        self.log_message(f"找到 {len(tokens)} 个翻译项")
+        
+        try:
+            # 所有语言的翻译任务共用一个线程池
+            self.run_translation_jobs(tokens, selected_languages, source_file, output_dir, resume=resume)
+        finally:
+            self.write_telemetry(source_file, output_dir)
+        return dict(self.translation_status)
+
+    def load_glossary(self, source_file: str):
+        """加载源文件对应的术语表并重建译文检查"""
+        glossary_path = self.find_glossary_file(source_file)
+        self.glossary = Glossary.load(glossary_path) if glossary_path else Glossary()
+        self.validator = OutputValidator(self.glossary)
+        if glossary_path:
+            self.log_message(f"使用术语表: {glossary_path}（{len(self.glossary)} 个术语）")
+
+    def plan_file(self, source_file: str, output_dir: str, selected_languages: List[str]) -> RunPlan:
+        """不调用API，估算翻译一个源文件需要的请求数、tokens、费用和耗时：
+        按与实际翻译相同的方式做增量对比、相同原文去重、查询翻译缓存并拆分任务，再用本地规则估算每个请求的tokens"""
+        self.load_glossary(source_file)
+        _, tokens = self.load_source_tokens(source_file)
+        if self.incremental:
+            self.load_source_manifest(self.get_manifest_path(source_file, output_dir), tokens)
+        namespaces = self.lookup_namespaces()
+        plan = RunPlan(self.prices, self.max_workers)
+        
+        lang_groups = {}
+        cached = {}
+        for lang in selected_languages:
+            output_path = self.get_output_path(source_file, output_dir, lang) if self.incremental else None
+            try:
+                todo, _ = self.plan_incremental(tokens, lang, output_path)
+            except (VDFSyntaxError, OSError, UnicodeError) as e:
+                # 与实际翻译相同：该语言会失败，不计入估算
+                self.log_message(f"无法读取已有的{self.steam_languages.get(lang, lang)}文件 {output_path}: {e}，不计入估算")
+                continue
+            finally:
+                tokens.drop_language(lang)
+            lang_groups[lang] = self.group_duplicate_keys(tokens, todo)
+            # 只读查询翻译缓存，未通过检查的缓存译文按需要重新翻译计算
+            items = {key: tokens[key] for key in lang_groups[lang]}
+            hits = self.translation_memory.peek_many(items.values(), lang, namespaces)
+            translated = {key: hits[value] for key, value in items.items() if value in hits}
+            cached[lang] = set(translated) - set(self.validation_failures(items, translated, lang))
+            plan.add_language(lang, self.steam_languages.get(lang, lang), len(todo), len(items), len(cached[lang]))
+        
+        seen_prefixes = set()
+        
+        def add_request(languages: List[str], prompt: str, payload: str, completion_tokens: int):
+            # 术语表和原文之前的固定前缀第二次出现起命中DeepSeek的上下文缓存（按64 tokens为单位）
+            prefix = SYSTEM_PROMPT + prompt[:len(prompt) - len(payload)].split(GLOSSARY_PROMPT_HEADER)[0]
+            cache_hit = estimate_tokens(prefix) // CACHE_UNIT_TOKENS * CACHE_UNIT_TOKENS if prefix in seen_prefixes else 0
+            seen_prefixes.add(prefix)
+            plan.add_request(languages, estimate_tokens(SYSTEM_PROMPT + prompt), cache_hit, completion_tokens)
+        
+        def add_single_language(items: Dict[str, str], lang: str):
+            if len(items) == 1:
+                text = next(iter(items.values()))
+                add_request([lang], self.single_prompt(text, lang), text, estimate_output_tokens([text], lang))
+            elif items:
+                prompt, payload = self.batch_prompt(items, lang)
+                # JSON回复中的键和格式按原样计算，值按目标语言估算
+                skeleton = json.dumps(dict.fromkeys(items, ""), ensure_ascii=False, indent=0)
+                add_request([lang], prompt, payload, estimate_tokens(skeleton) + estimate_output_tokens(items.values(), lang))
+        
+        for languages, items, key_map in self.plan_jobs(tokens, [lang for lang in selected_languages if lang in lang_groups],
+                                                        lang_groups):
+            def is_cached(lang, key):
+                return (key_map[lang][key] if key_map is not None else key) in cached[lang]
+            
+            # 与 translate_batch / translate_multi 相同：缓存命中的部分不请求，多语言请求中只缺一种语言时按单一语言请求
+            pending_languages = [lang for lang in languages if not all(is_cached(lang, key) for key in items)]
+            if len(pending_languages) > 1:
+                misses = {key: value for key, value in items.items()
+                          if any(not is_cached(lang, key) for lang in pending_languages)}
+                prompt, payload = self.multi_prompt(misses, pending_languages)
+                skeleton = json.dumps({key: dict.fromkeys(pending_languages, "") for key in misses}, ensure_ascii=False, indent=0)
+                add_request(pending_languages, prompt, payload, estimate_tokens(skeleton) + sum(
+                    estimate_output_tokens(misses.values(), lang) for lang in pending_languages))
+            elif pending_languages:
+                lang = pending_languages[0]
+                add_single_language({key: value for key, value in items.items() if not is_cached(lang, key)}, lang)
+        return plan
+
+    def write_telemetry(self, source_file: str, output_dir: str):
+        """写出本次运行的请求统计报告（出错只记录日志，不影响翻译结果）"""
+        self.telemetry.finish()
+        for message in self.telemetry.language_messages(self.steam_languages):
+            self.log_message(message)
+        self.log_message(self.telemetry.summary_message())
+        if self.transport is not None:
+            self.log_message(self.transport.stats_message())
+        json_path, prom_path = self.get_telemetry_paths(source_file, output_dir)
+        try:
+            self.telemetry.write_reports(json_path, prom_path, {"app": self.get_base_id(source_file), "model": self.model})
+        except OSError as e:
+            self.log_message(f"保存请求统计时出错: {e}")
+
+    def cancel_translation(self):
+        """取消翻译过程"""
+        self.translation_cancelled = True
+        # 立即断开进行中的流式请求，不必等待回复完成或超时
+        if self.transport is not None:
+            self.transport.abort()
+        self.log_message("正在取消翻译...")
+        self.update_status("取消中...")
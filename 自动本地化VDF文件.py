@@ -1,66 +1,30 @@
-import json
 import os
-import requests
+import queue
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import configparser
-from typing import Dict, List
 import threading
-import time
+from vdf_translator import VDFTranslator
 
-class VDFTranslatorGUI:
+class VDFTranslatorGUI(VDFTranslator):
+    # 界面事件队列的处理间隔（毫秒）
+    UI_PUMP_INTERVAL = 100
+    # 日志区域最多保留的行数，超出后删除最早的行
+    LOG_MAX_LINES = 5000
+    
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("VDF翻译工具 - 支持Steam所有语言")
         self.root.geometry("900x750")
         
-        # 配置文件路径
-        self.config_file = os.path.join(os.path.expanduser("~"), ".vdf_translator_config.ini")
-        
-        # Steam支持的语言代码映射
-        self.steam_languages = {
-            "arabic": "阿拉伯语",
-            "bulgarian": "保加利亚语",
-            "schinese": "简体中文",
-            "tchinese": "繁体中文",
-            "czech": "捷克语",
-            "danish": "丹麦语",
-            "dutch": "荷兰语",
-            "english": "英语",
-            "finnish": "芬兰语",
-            "french": "法语",
-            "german": "德语",
-            "greek": "希腊语",
-            "hungarian": "匈牙利语",
-            "italian": "意大利语",
-            "japanese": "日语",
-            "koreana": "韩语",
-            "norwegian": "挪威语",
-            "polish": "波兰语",
-            "portuguese": "葡萄牙语",
-            "brazilian": "巴西葡萄牙语",
-            "romanian": "罗马尼亚语",
-            "russian": "俄语",
-            "spanish": "西班牙语",
-            "latam": "拉丁美洲西班牙语",
-            "swedish": "瑞典语",
-            "thai": "泰语",
-            "turkish": "土耳其语",
-            "ukrainian": "乌克兰语",
-            "vietnamese": "越南语",
-            "indonesian": "印度尼西亚语",
-        }
-        
-        # 翻译状态
-        self.translation_status = {}  # 记录每种语言的翻译状态
         self.translation_thread = None
-        self.translation_cancelled = False
+        # 工作线程不直接操作Tk控件，只把日志、状态、进度和回调放入此队列，由主线程定时处理
+        self.ui_events = queue.Queue()
         
-        # 初始化配置
-        self.load_config()
+        super().__init__()
         
         self.setup_ui()
         self.load_saved_api_key()
+        self.root.after(self.UI_PUMP_INTERVAL, self.pump_ui_events)
     
     def setup_ui(self):
         # 创建主框架
@@ -140,6 +104,7 @@ class VDFTranslatorGUI:
         
         ttk.Button(button_frame, text="全选", command=self.select_all_languages).grid(row=0, column=0, padx=5)
         ttk.Button(button_frame, text="取消全选", command=self.deselect_all_languages).grid(row=0, column=1, padx=5)
+        ttk.Button(button_frame, text="清除所选语言缓存", command=self.clear_selected_cache).grid(row=0, column=2, padx=5)
         
         # 输出目录选择
         output_frame = ttk.LabelFrame(main_frame, text="输出设置", padding="10")
@@ -154,6 +119,24 @@ class VDFTranslatorGUI:
         self.browse_output_btn = ttk.Button(output_frame, text="浏览", command=self.browse_output_dir)
         self.browse_output_btn.grid(row=0, column=2, padx=(5, 0), pady=2)
         
+        # 翻译选项
+        options_frame = ttk.Frame(output_frame)
+        options_frame.grid(row=1, column=0, columnspan=3, sticky=tk.W, pady=(5, 0))
+        
+        ttk.Label(options_frame, text="批量大小:").grid(row=0, column=0, sticky=tk.W)
+        self.batch_size_var = tk.IntVar(value=self.batch_size)
+        ttk.Spinbox(options_frame, from_=1, to=100, textvariable=self.batch_size_var, width=6).grid(row=0, column=1, padx=(5, 0))
+        
+        ttk.Label(options_frame, text="并发数:").grid(row=0, column=2, sticky=tk.W, padx=(20, 0))
+        self.max_workers_var = tk.IntVar(value=self.max_workers)
+        ttk.Spinbox(options_frame, from_=1, to=32, textvariable=self.max_workers_var, width=6).grid(row=0, column=3, padx=(5, 0))
+        
+        self.incremental_var = tk.BooleanVar(value=self.incremental)
+        ttk.Checkbutton(options_frame, text="增量翻译（仅翻译新增或修改的文本）", variable=self.incremental_var).grid(row=0, column=4, padx=(20, 0))
+        
+        self.multi_target_var = tk.BooleanVar(value=self.multi_target)
+        ttk.Checkbutton(options_frame, text="多语言合并请求", variable=self.multi_target_var).grid(row=0, column=5, padx=(20, 0))
+        
         # 翻译按钮和进度条
         control_frame = ttk.Frame(main_frame)
         control_frame.grid(row=4, column=0, columnspan=2, pady=20)
@@ -161,15 +144,21 @@ class VDFTranslatorGUI:
         self.translate_btn = ttk.Button(control_frame, text="开始翻译", command=self.start_translation_thread)
         self.translate_btn.grid(row=0, column=0, padx=5)
         
+        self.resume_btn = ttk.Button(control_frame, text="继续上次翻译", command=lambda: self.start_translation_thread(resume=True))
+        self.resume_btn.grid(row=0, column=1, padx=5)
+        
         self.cancel_btn = ttk.Button(control_frame, text="取消翻译", command=self.cancel_translation, state=tk.DISABLED)
-        self.cancel_btn.grid(row=0, column=1, padx=5)
+        self.cancel_btn.grid(row=0, column=2, padx=5)
+        
+        self.plan_btn = ttk.Button(control_frame, text="估算用量", command=self.start_plan_thread)
+        self.plan_btn.grid(row=0, column=3, padx=5)
         
         self.progress = ttk.Progressbar(control_frame, mode='determinate', length=300)
-        self.progress.grid(row=0, column=2, padx=20, sticky=(tk.W, tk.E))
+        self.progress.grid(row=0, column=4, padx=20, sticky=(tk.W, tk.E))
         
         # 状态标签
         self.status_label = ttk.Label(control_frame, text="就绪")
-        self.status_label.grid(row=1, column=0, columnspan=3, pady=(10, 0))
+        self.status_label.grid(row=1, column=0, columnspan=5, pady=(10, 0))
         
         # 进度和日志区域
         log_frame = ttk.LabelFrame(main_frame, text="翻译日志", padding="10")
@@ -186,24 +175,6 @@ class VDFTranslatorGUI:
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
     
-    def load_config(self):
-        """加载配置文件"""
-        self.config = configparser.ConfigParser()
-        if os.path.exists(self.config_file):
-            self.config.read(self.config_file)
-            self.api_key = self.config.get('API', 'key', fallback='')
-        else:
-            self.api_key = ''
-    
-    def save_config(self):
-        """保存配置到文件"""
-        if not self.config.has_section('API'):
-            self.config.add_section('API')
-        self.config.set('API', 'key', self.api_key)
-        
-        with open(self.config_file, 'w', encoding='utf-8') as configfile:
-            self.config.write(configfile)
-    
     def load_saved_api_key(self):
         """加载保存的API密钥"""
         if self.api_key:
@@ -261,141 +232,80 @@ class VDFTranslatorGUI:
         for var in self.lang_vars.values():
             var.set(False)
     
+    def clear_selected_cache(self):
+        """清除所选语言的翻译缓存"""
+        selected_languages = [lang for lang, var in self.lang_vars.items() if var.get()]
+        if not selected_languages:
+            messagebox.showwarning("警告", "请先选择要清除缓存的语言")
+            return
+        
+        for lang in selected_languages:
+            removed = self.translation_memory.invalidate(lang)
+            self.log_message(f"已清除 {self.steam_languages[lang]} 的 {removed} 条翻译缓存")
+    
     def log_message(self, message):
-        """在日志区域添加消息"""
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-        self.log_text.config(state=tk.DISABLED)
-        self.root.update_idletasks()
+        """在日志区域添加消息（可在任意线程调用）"""
+        self.ui_events.put(("log", message))
     
     def update_status(self, message):
-        """更新状态标签"""
-        self.status_label.config(text=message)
-        self.root.update_idletasks()
+        """更新状态标签（可在任意线程调用）"""
+        self.ui_events.put(("status", message))
     
-    def extract_tokens_from_vdf(self, vdf_file_path: str) -> tuple:
-        """从VDF文件中提取语言和tokens"""
-        with open(vdf_file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        # 简单解析VDF格式
-        lines = content.split('\n')
-        language = None
-        tokens = {}
-        current_section = None
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if line.startswith('"Language"'):
-                # 提取语言
-                if i + 1 < len(lines):
-                    lang_line = lines[i + 1].strip()
-                    if lang_line.startswith('"') and lang_line.endswith('"'):
-                        language = lang_line[1:-1]
-            elif '"Tokens"' in line:
-                current_section = 'tokens'
-            elif current_section == 'tokens' and line.startswith('"NEW_ACHIEVEMENT_'):
-                # 解析token行
-                parts = line.split('"')
-                if len(parts) >= 4:
-                    key = parts[1]
-                    value = parts[3] if len(parts) > 3 else ""
-                    tokens[key] = value
-        
-        return language, tokens
-
-    def translate_text(self, text: str, target_language: str) -> str:
-        """使用DeepSeek API翻译单个文本"""
-        if not text.strip() or self.translation_cancelled:
-            return text
-            
-        # 获取目标语言的本地名称
-        target_lang_name = self.steam_languages.get(target_language, target_language)
-        
-        prompt = f"""
-        请将以下文本从中文翻译成{target_lang_name}。
-        请保持原文的语气和风格，不要添加额外的解释或说明。
-        如果原文是游戏成就名称或描述，请使用适合游戏语境的表达方式。
-        原文: {text}
-        翻译结果:
-        """
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "temperature": 0.3,
-            "max_tokens": 1000
-        }
-        
+    def set_progress_value(self, value):
+        """更新进度条（可在任意线程调用）"""
+        self.ui_events.put(("progress", value))
+    
+    def dispatch(self, callback):
+        """把工作线程中的界面操作交给Tk主线程执行"""
+        self.ui_events.put(("call", callback))
+    
+    def pump_ui_events(self):
+        """在Tk主线程中定时处理界面事件：本轮的日志合并为一次插入，状态和进度只应用最后一次"""
+        # 先安排下一轮，回调中弹出对话框时日志仍会继续刷新
+        self.root.after(self.UI_PUMP_INTERVAL, self.pump_ui_events)
+        lines = []
+        status = None
+        progress = None
         try:
-            response = requests.post("https://api.deepseek.com/v1/chat/completions", headers=headers, json=payload, timeout=30)
-            response.raise_for_status()
-            result = response.json()
-            translated_text = result['choices'][0]['message']['content'].strip()
-            # 清理可能的额外文本
-            if "翻译结果:" in translated_text:
-                translated_text = translated_text.split("翻译结果:")[-1].strip()
-            return translated_text
-        except Exception as e:
-            self.log_message(f"翻译错误: {e}")
-            return text
-
-    def translate_tokens(self, tokens: Dict[str, str], target_language: str) -> Dict[str, str]:
-        """翻译所有tokens"""
-        translated_tokens = {}
-        total_tokens = len([v for v in tokens.values() if v.strip()])
-        current = 0
-        
-        self.log_message(f"开始翻译 {total_tokens} 个文本项到 {self.steam_languages.get(target_language, target_language)}...")
-        
-        for key, value in tokens.items():
-            if self.translation_cancelled:
-                break
-                
-            if value.strip():  # 只翻译非空值
-                current += 1
-                self.log_message(f"翻译进度: {current}/{total_tokens} - {key}")
-                translated_value = self.translate_text(value, target_language)
-                translated_tokens[key] = translated_value
-            else:
-                translated_tokens[key] = value  # 保持空值不变
-        
-        return translated_tokens
-
-    def create_vdf_content(self, language: str, tokens: Dict[str, str]) -> str:
-        """创建VDF文件内容"""
-        vdf_content = '"lang"\n{\n'
-        vdf_content += f'\t"Language"\t"{language}"\n'
-        vdf_content += '\t"Tokens"\n\t{\n'
-        
-        for key, value in tokens.items():
-            vdf_content += f'\t\t"{key}"\t"{value}"\n'
-        
-        vdf_content += '\t}\n}'
-        return vdf_content
-
-    def start_translation_thread(self):
-        """启动翻译线程"""
+            while True:
+                kind, value = self.ui_events.get_nowait()
+                if kind == "log":
+                    lines.append(str(value))
+                elif kind == "status":
+                    status = value
+                elif kind == "progress":
+                    progress = value
+                else:
+                    try:
+                        value()
+                    except Exception as e:
+                        lines.append(f"界面更新出错: {e}")
+        except queue.Empty:
+            pass
+        
+        if lines:
+            self.append_log_lines(lines)
+        if status is not None:
+            self.status_label.config(text=status)
+        if progress is not None:
+            self.progress['value'] = progress
+    
+    def append_log_lines(self, lines):
+        """一次性插入多行日志，超出 LOG_MAX_LINES 时删除最早的行"""
+        self.log_text.config(state=tk.NORMAL)
+        self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+        line_count = int(self.log_text.index('end-1c').split('.')[0]) - 1
+        if line_count > self.LOG_MAX_LINES:
+            self.log_text.delete("1.0", f"{line_count - self.LOG_MAX_LINES + 1}.0")
+        self.log_text.see(tk.END)
+        self.log_text.config(state=tk.DISABLED)
+    
+    def start_translation_thread(self, resume: bool = False):
+        """在主线程中验证输入并读取选项，然后启动翻译线程"""
         if self.translation_thread and self.translation_thread.is_alive():
             messagebox.showwarning("警告", "翻译已在进行中，请等待完成或取消当前任务")
             return
         
-        self.translation_thread = threading.Thread(target=self.start_translation, daemon=True)
-        self.translation_thread.start()
-
-    def start_translation(self):
-        """开始翻译过程"""
         # 验证API密钥
         api_key = self.api_key_var.get()
         if api_key.startswith('*'):
@@ -406,138 +316,195 @@ class VDFTranslatorGUI:
             messagebox.showerror("错误", "请先输入API密钥")
             return
         
-        # 验证源文件
-        source_file = self.source_file_var.get()
-        if not source_file or not os.path.exists(source_file):
-            messagebox.showerror("错误", "请选择有效的源VDF文件")
+        paths = self.validate_paths()
+        if paths is None:
             return
-        
-        # 获取选中的语言
-        selected_languages = [lang for lang, var in self.lang_vars.items() if var.get()]
+        source_file, output_dir = paths
+        
+        if resume:
+            # 继续上次运行时使用运行日志中记录的语言
+            selected_languages = self.get_resume_languages(source_file, output_dir)
+            if selected_languages is None:
+                messagebox.showerror("错误", "输出目录中没有可以继续的翻译记录")
+                return
+        else:
+            # 获取选中的语言
+            selected_languages = [lang for lang, var in self.lang_vars.items() if var.get()]
         if not selected_languages:
             messagebox.showerror("错误", "请至少选择一种目标语言")
             return
         
-        # 验证输出目录
+        self.read_translation_options()
+        
+        # 重置翻译状态
+        self.translation_cancelled = False
+        # 设置可能已修改，重新创建传输层；先关闭上次运行的线程池和连接池
+        if self.transport is not None:
+            self.transport.close()
+        self.transport = self.create_transport()
+        self.translation_memory.reset_stats()
+        
+        # 启用取消按钮
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.translate_btn.config(state=tk.DISABLED)
+        self.resume_btn.config(state=tk.DISABLED)
+        self.plan_btn.config(state=tk.DISABLED)
+        
+        self.translation_thread = threading.Thread(
+            target=self.start_translation, args=(source_file, output_dir, selected_languages, resume), daemon=True
+        )
+        self.translation_thread.start()
+
+    def validate_paths(self):
+        """验证源文件和输出目录，返回 (源文件, 输出目录)，无效时提示并返回None"""
+        source_file = self.source_file_var.get()
+        if not source_file or not os.path.exists(source_file):
+            messagebox.showerror("错误", "请选择有效的源VDF文件")
+            return None
+        
         output_dir = self.output_dir_var.get()
         if not output_dir or not os.path.exists(output_dir):
             messagebox.showerror("错误", "请选择有效的输出目录")
+            return None
+        return source_file, output_dir
+
+    def read_translation_options(self):
+        """从界面读取翻译选项"""
+        try:
+            self.batch_size = max(1, int(self.batch_size_var.get()))
+        except (tk.TclError, ValueError):
+            self.batch_size = 20
+        try:
+            self.max_workers = max(1, int(self.max_workers_var.get()))
+        except (tk.TclError, ValueError):
+            self.max_workers = 4
+        self.incremental = self.incremental_var.get()
+        self.multi_target = self.multi_target_var.get()
+
+    def start_plan_thread(self):
+        """估算翻译用量（不调用API，不需要API密钥），在后台线程中计算后显示结果表格"""
+        if self.translation_thread and self.translation_thread.is_alive():
+            messagebox.showwarning("警告", "翻译已在进行中，请等待完成或取消当前任务")
             return
         
-        # 重置翻译状态
-        self.translation_cancelled = False
-        self.translation_status = {lang: "pending" for lang in selected_languages}
+        paths = self.validate_paths()
+        if paths is None:
+            return
+        source_file, output_dir = paths
+        selected_languages = [lang for lang, var in self.lang_vars.items() if var.get()]
+        if not selected_languages:
+            messagebox.showerror("错误", "请至少选择一种目标语言")
+            return
+        self.read_translation_options()
         
-        # 启用取消按钮
-        self.root.after(0, lambda: self.cancel_btn.config(state=tk.NORMAL))
-        self.root.after(0, lambda: self.translate_btn.config(state=tk.DISABLED))
+        self.translate_btn.config(state=tk.DISABLED)
+        self.resume_btn.config(state=tk.DISABLED)
+        self.plan_btn.config(state=tk.DISABLED)
+        self.update_status("正在估算...")
         
+        # 与翻译共用线程引用，估算期间不能开始翻译（两者共用术语表和译文检查）
+        self.translation_thread = threading.Thread(
+            target=self.run_plan, args=(source_file, output_dir, selected_languages), daemon=True
+        )
+        self.translation_thread.start()
+
+    def run_plan(self, source_file: str, output_dir: str, selected_languages):
+        """估算线程主体"""
+        try:
+            plan = self.plan_file(source_file, output_dir, selected_languages)
+            self.log_message(plan.summary_message())
+            self.dispatch(lambda: self.show_plan(plan))
+        except Exception as e:
+            self.log_message(f"估算时出错: {e}")
+            self.dispatch(lambda e=e: messagebox.showerror("错误", f"估算时出错: {e}"))
+        finally:
+            self.dispatch(lambda: self.translate_btn.config(state=tk.NORMAL))
+            self.dispatch(lambda: self.resume_btn.config(state=tk.NORMAL))
+            self.dispatch(lambda: self.plan_btn.config(state=tk.NORMAL))
+            self.update_status("就绪")
+
+    def show_plan(self, plan):
+        """在新窗口中以表格显示估算结果"""
+        window = tk.Toplevel(self.root)
+        window.title("翻译用量估算")
+        window.transient(self.root)
+        
+        rows = plan.rows()
+        columns = [str(i) for i in range(len(rows[0]))]
+        tree = ttk.Treeview(window, columns=columns, show="headings", height=min(len(rows), 20))
+        for i, title in enumerate(rows[0]):
+            tree.heading(columns[i], text=title)
+            tree.column(columns[i], width=110 if i else 90, anchor=tk.E if i else tk.W)
+        for row in rows[1:]:
+            tree.insert("", tk.END, values=row)
+        tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=10, pady=(10, 5))
+        
+        scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=tree.yview)
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S), pady=(10, 5))
+        tree.configure(yscrollcommand=scrollbar.set)
+        
+        ttk.Label(window, text=plan.summary_message(), wraplength=900).grid(row=1, column=0, columnspan=2, padx=10, pady=(0, 5))
+        ttk.Button(window, text="关闭", command=window.destroy).grid(row=2, column=0, columnspan=2, pady=(0, 10))
+        window.columnconfigure(0, weight=1)
+        window.rowconfigure(0, weight=1)
+
+    def start_translation(self, source_file: str, output_dir: str, selected_languages, resume: bool = False):
+        """翻译线程主体（resume 为 True 时根据运行日志继续上次未完成的翻译）"""
         try:
-            # 提取源文件信息
-            source_lang, tokens = self.extract_tokens_from_vdf(source_file)
-            self.root.after(0, lambda: self.log_message(f"源文件语言: {source_lang}"))
-            self.root.after(0, lambda: self.log_message(f"找到 {len(tokens)} 个翻译项"))
-            
             total_languages = len(selected_languages)
-            completed_languages = 0
             
-            # 为每个选中的语言翻译
-            for i, target_lang in enumerate(selected_languages):
-                if self.translation_cancelled:
-                    self.root.after(0, lambda: self.log_message("翻译已取消"))
-                    break
-                
-                self.root.after(0, lambda i=i, target_lang=target_lang: 
-                               self.update_status(f"正在翻译到 {self.steam_languages[target_lang]} ({i+1}/{total_languages})"))
-                self.root.after(0, lambda target_lang=target_lang: 
-                               self.log_message(f"\n开始翻译到 {self.steam_languages[target_lang]}..."))
-                
-                try:
-                    # 翻译tokens
-                    translated_tokens = self.translate_tokens(tokens, target_lang)
-                    
-                    # 如果翻译被取消，跳出循环
-                    if self.translation_cancelled:
-                        self.translation_status[target_lang] = "cancelled"
-                        break
-                    
-                    # 创建VDF内容
-                    vdf_content = self.create_vdf_content(target_lang, translated_tokens)
-                    
-                    # 生成输出文件名
-                    base_name = os.path.splitext(os.path.basename(source_file))[0]
-                    # 提取基础ID (假设格式为 "数字_loc_语言")
-                    try:
-                        base_id = base_name.split('_loc_')[0]
-                    except IndexError:
-                        self.log_message("源文件名格式不正确，无法提取基础ID")
-                        continue  # 跳过当前语言，继续下一个
-
-                    output_filename = f"{base_id}_loc_{target_lang}.vdf"
-                    output_path = os.path.join(output_dir, output_filename)
-                    
-                    # 保存文件
-                    with open(output_path, 'w', encoding='utf-8', newline='\n') as file:
-                        file.write(vdf_content)
-                    
-                    self.translation_status[target_lang] = "completed"
-                    self.root.after(0, lambda path=output_path, lang=target_lang: 
-                                   self.log_message(f"翻译完成! 文件已保存到: {path}"))
-                    
-                except Exception as e:
-                    self.translation_status[target_lang] = "failed"
-                    self.root.after(0, lambda e=e, lang=target_lang: 
-                                   self.log_message(f"翻译到 {self.steam_languages[lang]} 时出错: {e}"))
-                    continue  # 跳过当前语言，继续下一个
-                
-                completed_languages += 1
-                progress = (completed_languages / total_languages) * 100
-                self.root.after(0, lambda p=progress: self.set_progress_value(p))
+            self.translate_file(source_file, output_dir, selected_languages, resume=resume)
+            
+            self.translation_memory.trim()
+            cache_stats = self.translation_memory.stats_message()
+            self.log_message(cache_stats)
             
             # 翻译完成后的处理
             if not self.translation_cancelled:
                 failed_languages = [lang for lang, status in self.translation_status.items() if status == "failed"]
                 cancelled_languages = [lang for lang, status in self.translation_status.items() if status == "cancelled"]
                 completed_languages = [lang for lang, status in self.translation_status.items() if status == "completed"]
+                incomplete_languages = [lang for lang, status in self.translation_status.items() if status == "incomplete"]
                 
-                self.handle_translation_summary(failed_languages, cancelled_languages, completed_languages, total_languages)
+                self.handle_translation_summary(failed_languages, cancelled_languages, completed_languages, total_languages,
+                                                incomplete_languages)
         
         except Exception as e:
-            self.root.after(0, lambda e=e: self.log_message(f"翻译过程中出错: {e}"))
-            self.root.after(0, lambda e=e: messagebox.showerror("错误", f"翻译过程中出错: {e}"))
+            self.log_message(f"翻译过程中出错: {e}")
+            self.dispatch(lambda e=e: messagebox.showerror("错误", f"翻译过程中出错: {e}"))
         finally:
             # 恢复按钮状态
-            self.root.after(0, lambda: self.cancel_btn.config(state=tk.DISABLED))
-            self.root.after(0, lambda: self.translate_btn.config(state=tk.NORMAL))
-            self.root.after(0, lambda: self.update_status("完成"))
-            self.root.after(0, lambda: self.set_progress_value(0))  # 直接使用方法重置进度条
-
-    def cancel_translation(self):
-        """取消翻译过程"""
-        self.translation_cancelled = True
-        self.root.after(0, lambda: self.log_message("正在取消翻译..."))
-        self.root.after(0, lambda: self.update_status("取消中..."))
+            self.dispatch(lambda: self.cancel_btn.config(state=tk.DISABLED))
+            self.dispatch(lambda: self.translate_btn.config(state=tk.NORMAL))
+            self.dispatch(lambda: self.resume_btn.config(state=tk.NORMAL))
+            self.dispatch(lambda: self.plan_btn.config(state=tk.NORMAL))
+            self.update_status("完成")
+            self.set_progress_value(0)
 
     def run(self):
         """运行GUI应用"""
         self.root.mainloop()
 
-    def handle_translation_summary(self, failed_languages, cancelled_languages, completed_languages, total_languages):
+    def handle_translation_summary(self, failed_languages, cancelled_languages, completed_languages, total_languages,
+                                   incomplete_languages=()):
         summary_msg = f"\n翻译完成! 总计: {total_languages}, 成功: {len(completed_languages)}, 失败: {len(failed_languages)}, 取消: {len(cancelled_languages)}"
-        self.root.after(0, lambda: self.log_message(summary_msg))
+        if incomplete_languages:
+            summary_msg += f", 部分译文未通过检查: {len(incomplete_languages)}（再次翻译时重试）"
+        self.log_message(summary_msg)
+        
+        if incomplete_languages:
+            incomplete_names = [self.steam_languages[lang] for lang in incomplete_languages]
+            self.log_message(f"部分译文未通过检查的语言: {', '.join(incomplete_names)}")
         
         if failed_languages:
             failed_names = [self.steam_languages[lang] for lang in failed_languages]
-            self.root.after(0, lambda: self.log_message(f"失败的语言: {', '.join(failed_names)}"))
+            self.log_message(f"失败的语言: {', '.join(failed_names)}")
         
         if completed_languages:
             completed_names = [self.steam_languages[lang] for lang in completed_languages]
-            self.root.after(0, lambda: self.log_message(f"成功翻译的语言: {', '.join(completed_names)}"))
+            self.log_message(f"成功翻译的语言: {', '.join(completed_names)}")
         
-        self.root.after(0, lambda: messagebox.showinfo("完成", summary_msg))
-
-    def set_progress_value(self, value):
-        self.progress['value'] = value
+        self.dispatch(lambda: messagebox.showinfo("完成", summary_msg))
 
 def main():
     app = VDFTranslatorGUI()